@@ -1,9 +1,7 @@
+import time
+_IMPORT_START = time.perf_counter()
 import os
 import sys
-import io
-import glob
-import zipfile
-import shutil
 import streamlit as st
 import logging
 logging.getLogger('pdfminer.pdfinterp').setLevel(logging.ERROR)
@@ -15,18 +13,36 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 # ----------------- Your business logic import ---------------------
-from modules.ITR1 import ITR1BatchProcessor
+# Light modules only: pandas / pdfplumber / numpy are imported by the first job
+from modules.config_registry import load_config
+from modules.extract_cache import ExtractionCache
+from modules.form_sniffer import FormRouter
+from modules.jobs import JobManager
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+HEAVY_MODULES = ("pandas", "numpy", "pdfplumber", "pdfminer")
 
 # ----------------- Constants --------------------------------------
-INPUT_DIR = "INPUT"
 CONFIG_DIR = "config"
-os.makedirs(INPUT_DIR, exist_ok=True)
+AUTO_DETECT = "Auto-detect (mixed forms)"
+CACHE_DIR = os.path.join(".cache", "extracted")
+CACHE_MAX_BYTES = 1024 * 1024 * 1024
+JOB_POLL_SECONDS = 0.5
 os.makedirs(CONFIG_DIR, exist_ok=True)
 
 # ----------------- Helpers ----------------------------------------
-def get_config_map():
+def config_dir_stamp():
+    # Changes when a config file is added / removed / renamed (one stat per rerun)
+    return os.stat(CONFIG_DIR).st_mtime_ns
+
+def config_files_stamp():
+    # Changes when any config file is edited too
+    return tuple(sorted((f.name, f.stat().st_mtime_ns) for f in os.scandir(CONFIG_DIR) if f.is_file()))
+
+@st.cache_resource
+def get_config_map(stamp):
     """
     Map 'ITR1' -> 'config/ITR1_header.json' for files in config/ ending with '_header.json'.
+    Cached per config/ listing (stamp), so reruns do not list the folder again.
     """
     options = {}
     for fname in os.listdir(CONFIG_DIR):
@@ -35,28 +51,70 @@ def get_config_map():
             options[key] = os.path.join(CONFIG_DIR, fname)
     return options
 
-def zip_excels_in_memory(dir_path):
+@st.cache_resource
+def get_job_manager():
     """
-    Create an in-memory ZIP of all .xlsx files in dir_path.
-    Returns (bytes_or_None, count).
+    One JobManager per server process: jobs keep running across reruns and sessions,
+    and parsed results are reused for identical uploads under the same config.
     """
-    files = sorted(glob.glob(os.path.join(dir_path, "*.xlsx")))
-    if not files:
-        return None, 0
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-        for fp in files:
-            zf.write(fp, arcname=os.path.basename(fp))
-    buf.seek(0)
-    return buf.getvalue(), len(files)
-
-def clear_input_dir():
+    return JobManager(config_dir=CONFIG_DIR)
+
+@st.cache_resource
+def get_config(path, stamp):
     """
-    Delete INPUT folder and recreate it empty.
+    Parsed + compiled section config, kept until the file changes (stamp).
     """
-    if os.path.isdir(INPUT_DIR):
-        shutil.rmtree(INPUT_DIR)
-    os.makedirs(INPUT_DIR, exist_ok=True)
+    return load_config(path)
+
+@st.cache_resource
+def get_router(stamp):
+    """
+    Form router over every config in config/ (auto-detect), rebuilt when any changes.
+    """
+    return FormRouter(CONFIG_DIR)
+
+@st.cache_resource
+def cold_import_seconds():
+    """
+    Import time of the first script run in this server process (reruns find the
+    modules already loaded, so only the first measurement means anything).
+    """
+    return IMPORT_SECONDS
+
+def show_job(job):
+    """
+    Render progress / results of a background export job.
+    """
+    if job.running:
+        frac = job.done / job.total if job.total else 0.0
+        text = (f"{job.stage}: {job.done}/{job.total} PDFs · {job.throughput:.1f} PDFs/s"
+                + (f" · {job.current}" if job.current else ""))
+        st.progress(frac, text=text)
+        return
+
+    if job.error:
+        st.error(f"Export failed: {job.error}")
+        return
+
+    st.caption(f"Processed {job.total} PDF(s) in {job.elapsed:.1f}s "
+               f"({job.cached} from cache, {job.throughput:.1f} PDFs/s).")
+    for name, err in job.errors.items():
+        st.warning(f"{name}: {err}")
+    if job.metadata is not None:
+        st.dataframe(job.metadata)
+    if job.report is not None and job.report.stage_totals():
+        with st.expander("⏱️ Where the time went"):
+            st.dataframe(job.report.summary(), hide_index=True)
+    if not job.zip_bytes:
+        st.warning("No Excel files found after export.")
+        return
+    st.success(f"Prepared {job.count} Excel file(s) for download.")
+    st.download_button(
+        label="⬇️ Download Excel ZIP",
+        data=job.zip_bytes,
+        file_name="ITR_by_PAN.zip",
+        mime="application/zip",
+    )
 
 def ensure_session_keys():
     if "uploader_key" not in st.session_state:
@@ -64,7 +122,7 @@ def ensure_session_keys():
 
 def reset_uploader():
     st.session_state.uploader_key += 1
-    clear_input_dir()
+    st.session_state.pop("job_id", None)
 
 # ----------------- UI ---------------------------------------------
 st.set_page_config(page_title="ITR Exporter", layout="centered")
@@ -72,66 +130,53 @@ st.title("📄 Simple ITR PDF → Excel Exporter")
 
 ensure_session_keys()
 
+# Startup cost of this server process (heavy libraries show up once a job has run)
+heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+st.sidebar.caption(f"⏱️ Cold import: {cold_import_seconds() * 1000:.0f} ms · "
+                   f"heavy libraries loaded: {', '.join(heavy) or 'none yet'}")
+
 st.button("🔄 Refresh", on_click=reset_uploader)
 # st.rerun()
 
 # Config dropdown (simple)
-config_map = get_config_map()
+config_map = get_config_map(config_dir_stamp())
 selected_form = st.selectbox(
     "Select ITR config",
-    options=sorted(config_map.keys()) if config_map else [],
+    # Explicit configs first: the default stays the first one (ITR1), as before
+    options=sorted(config_map.keys()) + [AUTO_DETECT] if config_map else [],
+    help="Auto-detect reads the form type on each PDF's first page and picks its config.",
 )
-config_path = config_map.get(selected_form)
+config_path = config_map.get(selected_form)  # None for auto-detect
 
-# Upload PDFs (saved into INPUT)
+# Upload PDFs (kept in memory; pdfplumber reads the buffers directly)
 uploaded_files = st.file_uploader("Upload PDFs", type=["pdf"], 
             accept_multiple_files=True,
             key=f"pdf_uploader_{st.session_state.uploader_key}")
 if uploaded_files:
-    for f in uploaded_files:
-        save_path = os.path.join(INPUT_DIR, f.name)
-        with open(save_path, "wb") as out:
-            out.write(f.getbuffer())
-    st.success(f"Uploaded {len(uploaded_files)} file(s) into `{INPUT_DIR}`.")
+    st.success(f"Uploaded {len(uploaded_files)} file(s).")
 
 st.divider()
 
-# --- Export & Download (ZIP of Excel) with progress bar ---
+# --- Export & Download (ZIP of Excel): runs as a background job ---
 if st.button("📦 Export & Download (ZIP)"):
-    if not config_path:
+    if not selected_form:
         st.error("Please select a config (e.g., ITR1).")
+    elif not uploaded_files:
+        st.error("Please upload at least one PDF.")
     else:
-        pbar = st.progress(0, text="Preparing export...")
         try:
-            pbar.progress(20, text="Initializing processor...")
-            processor = ITR1BatchProcessor(INPUT_DIR, config_path)
-
-            pbar.progress(40, text="Processing PDFs...")
-            processor.process_all()
-                        
-            # Minimal preview (optional)
-            pbar.progress(50, text="metadata_df")
-            metadata_df = processor.metadata()
-            st.dataframe(metadata_df)
-
-            pbar.progress(60, text="Exporting Excel by PAN...")
-            processor.export_by_pan()
-
-            pbar.progress(80, text="Building ZIP...")
-            zip_bytes, count = zip_excels_in_memory(INPUT_DIR)
-
-            if not zip_bytes or count == 0:
-                pbar.progress(0)
-                st.warning("No Excel files found after export.")
-            else:
-                pbar.progress(100, text="ZIP ready.")
-                st.success(f"Prepared {count} Excel file(s) for download.")
-                st.download_button(
-                    label="⬇️ Download Excel ZIP",
-                    data=zip_bytes,
-                    file_name="ITR_by_PAN.zip",
-                    mime="application/zip",
-                )
+            cache = ExtractionCache(CACHE_DIR, CACHE_MAX_BYTES)
+            stamp = config_files_stamp()
+            config = get_config(config_path, stamp) if config_path else get_router(stamp)
+            st.session_state.job_id = get_job_manager().submit(
+                {f.name: f.getvalue() for f in uploaded_files}, config, cache=cache
+            )
         except Exception as e:
-            pbar.progress(0)
-            st.error(f"Export failed: {e}")
\ No newline at end of file
+            st.error(f"Export failed: {e}")
+
+job = get_job_manager().get(st.session_state.get("job_id"))
+if job is not None:
+    show_job(job)
+    if job.running:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
@@ -0,0 +1,91 @@
+"""
+Section cleaning: per-cell clean_row vs the vectorized one, and clean_int vs to_amounts.
+
+    python -m benchmarks.bench_clean_row [--rows 20000]
+
+Uses a synthetic Schedule TDS-style table (row number, TAN, name, amounts, page
+furniture rows and blank cells) the size of a large multi-page schedule.
+"""
+import argparse
+import random
+import time
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from modules.helper import clean_int, clean_row, to_amounts
+
+NAMES = ["ACME INDUSTRIES LTD", "GLOBAL BANK", "STATE TRADERS", "  INFRA CORP  ", "Nil"]
+FURNITURE = [
+    "If the return is verified after 30 days of transmission, the date of verification",
+    "Acknowledgement Number : 123456789012",
+]
+FURNITURE_PATTERNS = ["If the return is verified after 30 days of transmission", "Acknowledgement Number"]
+
+
+def clean_row_per_cell(df):
+    # clean_row as it was: df.map + replace + dropna + row-wise agg + one str.contains per pattern
+    df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
+    df = df.replace("", np.nan)
+    df = df.dropna(axis=1, how="all")
+    df = df.dropna(axis=0, how="all")
+    row_content = df.fillna("").astype(str).agg(" ".join, axis=1)
+    masks = [row_content.str.contains(p, case=False, regex=True) for p in FURNITURE_PATTERNS]
+    df = df[~reduce(np.logical_or, masks)]
+    return df.dropna(axis=0, how="all")
+
+
+def make_table(n_rows, seed=0):
+    rng = random.Random(seed)
+    rows = [["(1)", "(2)", "(3)", "(4)", "(5)", "(6)", "(7)", None]]
+    for i in range(1, n_rows):
+        if rng.random() < 0.02:
+            rows.append([rng.choice(FURNITURE)] + [None] * 7)
+            continue
+        if rng.random() < 0.03:
+            rows.append([""] + [None] * 7)
+            continue
+        amount = lambda: f"{rng.randint(0, 9_999_999):,}" if rng.random() < 0.9 else rng.choice(["", "Nil", " "])
+        rows.append([
+            str(i), f"ABCD{rng.randint(10000, 99999)}E", rng.choice(NAMES),
+            amount(), str(rng.choice([2023, 2024])), amount(), amount(), None,
+        ])
+    return pd.DataFrame(rows)
+
+
+def timed(fn, *args, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    df = make_table(args.rows)
+    t_old, r_old = timed(clean_row_per_cell, df)
+    t_new, r_new = timed(clean_row, df)
+    pd.testing.assert_frame_equal(r_old, r_new, check_index_type=False, check_column_type=False)
+    print(f"clean_row            rows={args.rows} kept={len(r_new)} cols={len(r_new.columns)}")
+    print(f"  per-cell           {t_old * 1000:9.1f} ms")
+    print(f"  vectorized         {t_new * 1000:9.1f} ms   x{t_old / t_new:.1f}")
+
+    col = r_new[3]
+    per_value = lambda s: [clean_int(v) if isinstance(v, str) else v for v in s]
+    t_int, r_int = timed(per_value, col)
+    t_vec, r_vec = timed(to_amounts, col)
+    assert [v for v in r_int if isinstance(v, int)] == [v for v in r_vec.tolist() if v is not pd.NA]
+    print(f"amounts              values={len(col)} parsed={int(r_vec.notna().sum())}")
+    print(f"  clean_int per cell {t_int * 1000:9.1f} ms")
+    print(f"  to_amounts (Int64) {t_vec * 1000:9.1f} ms   x{t_int / t_vec:.1f}")
+
+
+if __name__ == "__main__":
+    main()
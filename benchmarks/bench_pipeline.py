@@ -0,0 +1,184 @@
+"""
+End-to-end pipeline benchmark on synthetic returns, with a stored baseline.
+
+    python -m benchmarks.bench_pipeline [--quick] [--save-baseline] [--workers 4]
+
+Scenarios (each run in its own process, so peak RSS is per scenario):
+  rows-<kind>-<n>  n returns from _extracted.txt row fixtures through ITR1Sections
+                   (no PDF parsing) + export_by_pan
+  pdf-<kind>-<n>   n generated PDFs through process_all (pdfplumber) + export_by_pan
+kind is short (4 pages) or long (80 pages). Stage times come from the batch
+RunReport. Results are compared with benchmarks/baseline.json; a scenario or stage
+slower than the baseline by more than --tolerance (or using more memory than
+--mem-tolerance allows), or a scenario the baseline does not have, is a regression
+and the exit code is 1. Baselines are machine-specific, so none is committed: save
+one per box with --save-baseline. Without one the script exits with 2 before
+running anything.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.fixtures import CONFIG, LONG_PAGES, SHORT_PAGES, FixtureRows, make_templates
+from modules.ITR1 import DEBUG_OFF, ITR1BatchProcessor
+from modules.isolation import IsolatedRunner
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+KINDS = {"short": SHORT_PAGES, "long": LONG_PAGES}
+TEMPLATES = 4
+RETURNS_PER_PAN = 4
+MIN_SECONDS = 0.05  # differences below this are noise, whatever the ratio
+
+
+def _returns(n):
+    # (ack, pan, dof) of n returns, RETURNS_PER_PAN filing years per PAN
+    for i in range(n):
+        pan = f"ABCDE{(i // RETURNS_PER_PAN) % 10000:04d}F"
+        yield f"{100000000000 + i}", pan, f"31-Jul-{2020 + i % RETURNS_PER_PAN}"
+
+
+def run_scenario(source, kind, n, fixture_dir, workers):
+    # Runs in a fresh process; returns the scenario's measurements
+    templates = [f"{kind}_{i}" for i in range(TEMPLATES)]
+    out_dir = tempfile.mkdtemp(prefix="itr-bench-")
+    try:
+        t0 = time.perf_counter()
+        if source == "rows":
+            processor = ITR1BatchProcessor(None, CONFIG, cache=FixtureRows(fixture_dir), debug=DEBUG_OFF)
+            buffers = {
+                f"r{i:05d}.pdf": FixtureRows.buffer(templates[i % TEMPLATES], ack, pan, dof)
+                for i, (ack, pan, dof) in enumerate(_returns(n))
+            }
+            processor.process_buffers(buffers, workers=workers)
+        else:
+            pdf_dir = os.path.join(out_dir, "pdfs")
+            os.makedirs(pdf_dir)
+            for i in range(n):
+                shutil.copy(os.path.join(fixture_dir, templates[i % TEMPLATES] + ".pdf"),
+                            os.path.join(pdf_dir, f"r{i:05d}.pdf"))
+            processor = ITR1BatchProcessor(pdf_dir, CONFIG, debug=DEBUG_OFF, dump_text=False)
+            processor.process_all(workers=workers)
+        processed = time.perf_counter()
+
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        try:
+            processor.export_by_pan(out_dir, workers=workers)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        done = time.perf_counter()
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    files = processor.report.files.values()
+    return {
+        "returns": n,
+        "errors": len(processor.errors),
+        "pages": sum(rec.get("pages") or 0 for rec in files),
+        "rows": sum(rec.get("rows") or 0 for rec in files),
+        "seconds": done - t0,
+        "process_seconds": processed - t0,
+        "stages": processor.report.stage_totals(),
+        # Linux reports ru_maxrss in KB
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def compare(name, result, base, tolerance, mem_tolerance):
+    problems = []
+
+    def slower(label, now, then):
+        if then is not None and now > then * (1 + tolerance) and now - then > MIN_SECONDS:
+            problems.append(f"{label} {then:.3f}s -> {now:.3f}s (+{100 * (now / then - 1):.0f}%)")
+
+    slower("end-to-end", result["seconds"], base.get("seconds"))
+    for stage, seconds in result["stages"].items():
+        slower(stage, seconds, base.get("stages", {}).get(stage))
+    then = base.get("peak_rss_mb")
+    if then and result["peak_rss_mb"] > then * (1 + mem_tolerance):
+        problems.append(f"peak RSS {then:.0f} MB -> {result['peak_rss_mb']:.0f} MB")
+    return [f"{name}: {p}" for p in problems]
+
+
+def print_result(name, r, base):
+    vs = f"   (baseline {base['seconds']:.2f}s)" if base else ""
+    print(f"{name:<18} returns={r['returns']:<5} pages={r['pages']:<7} rows={r['rows']:<9} "
+          f"errors={r['errors']}")
+    print(f"  {'end-to-end':<22} {r['seconds']:9.2f} s{vs}")
+    print(f"  {'peak RSS':<22} {r['peak_rss_mb']:9.0f} MB")
+    for stage, seconds in sorted(r["stages"].items(), key=lambda kv: -kv[1]):
+        print(f"  {stage:<22} {seconds:9.3f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,100,5000", help="returns per row-fixture scenario")
+    parser.add_argument("--pdf-sizes", default="1", help="returns per PDF scenario (pdfplumber is slow)")
+    parser.add_argument("--kinds", default="short,long")
+    parser.add_argument("--quick", action="store_true", help="sizes 1,100 only")
+    parser.add_argument("--workers", type=int, default=None, help="batch workers (default: serial)")
+    parser.add_argument("--fixtures", default=None, help="fixture folder (default: a temp dir)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--mem-tolerance", type=float, default=0.25)
+    parser.add_argument("--timeout", type=float, default=None, help="seconds per scenario")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("scenarios", {})
+    elif not args.save_baseline:
+        # Nothing to compare against would make every run pass: refuse before benchmarking
+        print(f"no baseline at {args.baseline}: record one on this machine with --save-baseline",
+              file=sys.stderr)
+        return 2
+
+    sizes = [1, 100] if args.quick else [int(x) for x in args.sizes.split(",") if x]
+    pdf_sizes = [int(x) for x in args.pdf_sizes.split(",") if x]
+    kinds = [k for k in args.kinds.split(",") if k]
+
+    fixture_dir = args.fixtures or tempfile.mkdtemp(prefix="itr-fixtures-")
+    for kind in kinds:
+        make_templates(fixture_dir, KINDS[kind], TEMPLATES, pdf=bool(pdf_sizes))
+
+    scenarios = [(f"rows-{k}-{n}", ("rows", k, n, fixture_dir, args.workers)) for k in kinds for n in sizes]
+    scenarios += [(f"pdf-{k}-{n}", ("pdf", k, n, fixture_dir, args.workers)) for k in kinds for n in pdf_sizes]
+
+    results, regressions = {}, []
+    runner = IsolatedRunner(run_scenario, workers=1, timeout=args.timeout)
+    for name, ok, value in runner.run(scenarios):
+        if not ok:
+            regressions.append(f"{name}: {value}")
+            print(f"{name:<18} ❌ {value}")
+            continue
+        results[name] = value
+        print_result(name, value, baseline.get(name))
+        if name in baseline:
+            regressions += compare(name, value, baseline[name], args.tolerance, args.mem_tolerance)
+        elif not args.save_baseline:
+            regressions.append(f"{name}: not in the baseline (record it with --save-baseline)")
+
+    if not args.fixtures:
+        shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "scenarios": {**baseline, **results}}, f, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.baseline}")
+
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Section start scanning: per-section re.search loop vs StartScanner.
+
+    python -m benchmarks.bench_section_scanner [--rows 20000]
+
+Runs on the bundled configs: the section configs' table_start_ptr patterns, plus the
+ITR2 line config's PATTERNs used as a stress case with ~140 start patterns.
+"""
+import argparse
+import random
+import re
+import time
+
+from modules.config_registry import StartScanner, load_config
+
+FILLER = [
+    "Gross Salary", "Income from House Property", "1,20,000", "Total", "(1)", "(2)",
+    "Name of Employer", "Deduction u/s 16", "Nil", "Yes", "No", "B1", "C1", "D1",
+    "Tax payable on total income", "Interest u/s 234A", "Refund", "₹ 5,000",
+]
+
+
+def make_rows(n_rows, literals, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n_rows):
+        cells = rng.sample(FILLER, rng.randint(1, 5))
+        if rng.random() < 0.05:
+            cells.insert(0, rng.choice(literals))
+        rows.append(" ".join(cells))
+    return rows
+
+
+def literal_of(pattern):
+    # Rough readable text for a regex so some rows actually hit a section
+    text = pattern.replace("\\s+", " ").replace("\\s*", " ").replace("\\", "")
+    return re.sub(r"[\^\$\(\)\[\]\?\*\+\|]", "", text)
+
+
+def loop_original(patterns, rows):
+    # What extract_sections did before: re.search with raw strings, in config order
+    out = []
+    for row_str in rows:
+        found = None
+        for sec, pat in patterns.items():
+            if pat and re.search(pat, row_str, re.IGNORECASE):
+                found = sec
+                break
+        out.append(found)
+    return out
+
+
+def loop_compiled(patterns, rows):
+    out = []
+    for row_str in rows:
+        found = None
+        for sec, pat in patterns.items():
+            if pat and pat.search(row_str):
+                found = sec
+                break
+        out.append(found)
+    return out
+
+
+def scanner_pass(scanner, rows):
+    return [scanner.first_match(row_str) for row_str in rows]
+
+
+def timed(fn, *args, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench(name, raw_patterns, n_rows):
+    compiled = {k: re.compile(v, re.IGNORECASE) if v else None for k, v in raw_patterns.items()}
+    rows = make_rows(n_rows, [literal_of(p) for p in raw_patterns.values() if p])
+    scanner = StartScanner(compiled)
+
+    t_orig, r_orig = timed(loop_original, raw_patterns, rows)
+    t_comp, r_comp = timed(loop_compiled, compiled, rows)
+    t_scan, r_scan = timed(scanner_pass, scanner, rows)
+    assert r_orig == r_comp == r_scan, f"{name}: scanner disagrees with the section loop"
+
+    hits = sum(1 for r in r_scan if r)
+    print(f"{name:<28} sections={len(scanner.sections):>4} rows={n_rows} hits={hits}")
+    print(f"  re.search loop (strings)   {t_orig * 1000:9.1f} ms")
+    print(f"  compiled loop              {t_comp * 1000:9.1f} ms")
+    print(f"  StartScanner               {t_scan * 1000:9.1f} ms   x{t_orig / t_scan:.1f} vs original")
+    print(f"  patterns without a literal {sum(1 for e in scanner._entries if e[2] is None):>4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    for path in ("config/ITR1_header.json", "config/ITR2_header.json"):
+        raw = {k: v.get("table_start_ptr") for k, v in load_config(path).raw.items()}
+        bench(path, raw, args.rows)
+
+    line = load_config("config/ITR2_line.json")
+    raw = {k: f["pattern"].pattern for k, f in line.fields.items()}
+    bench("config/ITR2_line.json PATTERN", raw, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Cold-start import cost of the Streamlit app, measured in fresh interpreters.
+
+    python -m benchmarks.bench_startup [--runs 5] [--budget 0.5]
+
+Imports what app.py imports at startup (streamlit, when installed, plus the app's
+own modules) and reports the median wall time and which heavy libraries got
+loaded. pandas / numpy / pdfplumber / pdfminer must only load once a job starts;
+the exit code is 1 when one of them is imported at startup or the median is over
+--budget seconds.
+"""
+import argparse
+import importlib.util
+import json
+import statistics
+import subprocess
+import sys
+
+APP_MODULES = ["modules.config_registry", "modules.extract_cache", "modules.form_sniffer", "modules.jobs"]
+HEAVY_MODULES = ["pandas", "numpy", "pdfplumber", "pdfminer"]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+print(json.dumps({{"seconds": time.perf_counter() - t0,
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(modules):
+    out = subprocess.run([sys.executable, "-c", _PROBE.format(modules=modules, heavy=HEAVY_MODULES)],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=0.5, help="allowed median seconds for the app modules")
+    args = parser.parse_args()
+
+    streamlit = ["streamlit"] if importlib.util.find_spec("streamlit") else []
+    problems = []
+    for label, modules in [("app modules", APP_MODULES), ("streamlit + app", streamlit + APP_MODULES)]:
+        if label != "app modules" and not streamlit:
+            print(f"{label:<18} skipped (streamlit not installed)")
+            continue
+        runs = [measure(modules) for _ in range(args.runs)]
+        median = statistics.median(r["seconds"] for r in runs)
+        heavy = sorted({m for r in runs for m in r["heavy"]})
+        print(f"{label:<18} {median * 1000:8.0f} ms median of {args.runs}   "
+              f"heavy loaded: {', '.join(heavy) or 'none'}")
+        if heavy:
+            problems.append(f"{label}: imports {', '.join(heavy)} at startup")
+        if label == "app modules" and median > args.budget:
+            problems.append(f"{label}: {median:.2f}s > budget {args.budget:.2f}s")
+
+    for line in problems:
+        print(f"REGRESSION {line}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Synthetic ITR-like returns for the benchmarks: row fixtures in the _extracted.txt
+dump format, and matching PDFs (ruled tables, one per page) that pdfplumber reads
+back as the same rows. Everything is generated from a section config, offline,
+with no dependency beyond the app's own.
+
+    python -m benchmarks.fixtures OUT_DIR [--pages 4] [--templates 4]
+"""
+import argparse
+import ast
+import os
+import random
+import re
+
+from modules.config_registry import EMPTY_ROW_SPECIFIC, load_config
+from modules.process_pdf import _page_rows
+
+CONFIG = "config/ITR1_header.json"
+N_COLS = 8
+ROWS_PER_PAGE = 25
+SHORT_PAGES, LONG_PAGES = 4, 80
+
+NAMES = ["ACME INDUSTRIES LTD", "GLOBAL BANK", "STATE TRADERS", "INFRA CORP", "Nil"]
+FILLER = [
+    "Gross receipts", "Interest on savings", "Salary as per section 17(1)",
+    "Standard deduction u/s 16(ia)", "Value of perquisites", "Profits in lieu of salary",
+    "Rebate u/s 87A", "Fee u/s 234F", "Relief u/s 89",
+]
+_DUMP_ROW = re.compile(r"\d+\|\d+\|(\[.*\])$")
+
+
+def literal_of(pattern):
+    # Readable text the (start / end) pattern matches: first branch, escapes resolved
+    m = re.match(r"\^?\((.*?)\|", pattern)
+    if m:
+        pattern = m.group(1)
+    text = re.sub(r"\\s[+*]", " ", pattern)
+    return re.sub(r"\\(.)", r"\1", text).strip("^$")
+
+
+def _row(*cells):
+    cells = list(cells)[:N_COLS]
+    return cells + [""] * (N_COLS - len(cells))
+
+
+def _merged(text):
+    # A full-width cell: pdfplumber gives the text, then None for the spanned cells
+    return [text] + [None] * (N_COLS - 1)
+
+
+def _amount(rng):
+    return f"{rng.randint(0, 9_999_999):,}"
+
+
+def metadata_rows(ack, pan, dof):
+    return [
+        _merged(f"Acknowledgement Number : {ack} Date of Filing : {dof}"),
+        _row("PAN", pan, "Name", "ASSESSEE NAME"),
+    ]
+
+
+def section_rows(name, spec, n_data, rng):
+    start, end = spec.get("table_start_ptr"), spec.get("ftr_row_map")
+    labels = list(spec.get("table_header", {})) or spec.get("hdr_row_map", [])[:1]
+    rows = [_merged(literal_of(start))]
+    if len(labels) == 1 and len(labels[0]) > 12:
+        rows.append(_merged(labels[0]))
+    else:
+        rows.append(_row(*labels, *("Col %d" % i for i in range(len(labels), N_COLS))))
+    prefix = (spec.get("indentation_skip") or [""])[0]
+    for i in range(n_data):
+        rows.append(_row(f"{prefix}{i + 2}", f"ABCDE{rng.randint(1000, 9999)}F", rng.choice(NAMES),
+                         *(_amount(rng) for _ in range(N_COLS - 3))))
+    if end == EMPTY_ROW_SPECIFIC:
+        rows.append([""] + [None] * (N_COLS - 1))
+    elif end:
+        rows.append(_row(literal_of(end), *([""] * (N_COLS - 2)), _amount(rng)))
+    return rows
+
+
+def return_rows(pages, seed=0, ack="100000000001", pan="ABCDE1234F", dof="31-Jul-2024", config=CONFIG):
+    """
+    Rows of one synthetic return: metadata, then every configured section in config
+    order, padded with filler rows (outside any section) to about `pages` pages.
+    """
+    rng = random.Random(seed)
+    specs = [(name, spec) for name, spec in load_config(config).raw.items() if spec.get("table_start_ptr")]
+    target = pages * ROWS_PER_PAGE
+    per_section = max(1, int(target * 0.6) // len(specs) - 3)
+    blocks = [section_rows(name, spec, rng.randint(1, per_section), rng) for name, spec in specs]
+    filler = max(0, (target - 2 - sum(map(len, blocks))) // len(blocks))
+
+    rows = metadata_rows(ack, pan, dof)
+    for block in blocks:
+        rows.extend(block)
+        rows.extend(_row(rng.choice(FILLER), "", _amount(rng)) for _ in range(filler))
+    return rows
+
+
+def pages_of(rows):
+    return [rows[i:i + ROWS_PER_PAGE] for i in range(0, len(rows), ROWS_PER_PAGE)]
+
+
+# ---------------------------------------------------------
+# _extracted.txt dumps (the process_pdf format)
+# ---------------------------------------------------------
+def write_dump(path, rows, source="<synthetic>"):
+    index = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source + "\n")
+        for page_num, table in enumerate(pages_of(rows), start=1):
+            _, index = _page_rows(f, page_num, table, index)
+
+
+def read_dump(path):
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            m = _DUMP_ROW.search(line.rstrip("\n"))
+            if m:
+                rows.append(ast.literal_eval(m.group(1)))
+    return rows
+
+
+# ---------------------------------------------------------
+# Minimal PDF writer: ruled tables, base-14 Helvetica, no dependencies
+# ---------------------------------------------------------
+PAGE_W, PAGE_H = 595, 842
+X0, Y_TOP, ROW_H, FONT = 18, 810, 30, 4
+COL_W = [160] + [57] * (N_COLS - 1)
+
+
+def _pdf_text(text):
+    return str(text).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_stream(table):
+    ops = ["0.5 w"]
+    for r, row in enumerate(table):
+        y = Y_TOP - (r + 1) * ROW_H
+        merged = all(cell is None for cell in row[1:])
+        widths = [sum(COL_W)] if merged else COL_W
+        x = X0
+        for w, cell in zip(widths, row):
+            ops.append(f"{x} {y} {w} {ROW_H} re S")
+            if cell:
+                ops.append(f"BT /F1 {FONT} Tf {x + 2} {y + ROW_H / 2 - 2} Td ({_pdf_text(cell)}) Tj ET")
+            x += w
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_pdf(path, rows):
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for table in pages_of(rows):
+        stream = _page_stream(table)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R >> >> >>" % (PAGE_W, PAGE_H, len(objects)))
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+# ---------------------------------------------------------
+# Batch source: N returns from a few dumped templates, no PDF parsing
+# ---------------------------------------------------------
+class FixtureRows:
+    """
+    Stands in for an ExtractionCache: every buffer "<template>|<ack>|<pan>|<dof>" is a
+    hit whose rows are the template dump with that return's metadata. Drives the
+    real ITR1Sections pipeline for thousands of returns without pdfplumber.
+    Pickles as its folder (worker processes reload the templates).
+    """
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+        self._templates = {}
+
+    def __getstate__(self):
+        return {"fixture_dir": self.fixture_dir, "_templates": {}}
+
+    @staticmethod
+    def buffer(template, ack, pan, dof="31-Jul-2024"):
+        return f"{template}|{ack}|{pan}|{dof}".encode()
+
+    def key(self, input_file, settings):
+        return bytes(input_file).decode()
+
+    def get(self, key):
+        template, ack, pan, dof = key.split("|")
+        if template not in self._templates:
+            self._templates[template] = read_dump(os.path.join(self.fixture_dir, template + "_extracted.txt"))
+        rows = self._templates[template]
+        return metadata_rows(ack, pan, dof) + rows[2:]
+
+    def put(self, key, rows):
+        pass
+
+
+def make_templates(out_dir, pages, count, pdf=False):
+    # Writes <kind>_<i>_extracted.txt (and .pdf) templates; returns their names
+    os.makedirs(out_dir, exist_ok=True)
+    kind = "long" if pages >= LONG_PAGES else "short" if pages == SHORT_PAGES else f"p{pages}"
+    names = []
+    for i in range(count):
+        name = f"{kind}_{i}"
+        rows = return_rows(pages, seed=i)
+        write_dump(os.path.join(out_dir, name + "_extracted.txt"), rows, name + ".pdf")
+        if pdf:
+            write_pdf(os.path.join(out_dir, name + ".pdf"), rows)
+        names.append(name)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--pages", type=int, default=SHORT_PAGES)
+    parser.add_argument("--templates", type=int, default=4)
+    args = parser.parse_args()
+    names = make_templates(args.out_dir, args.pages, args.templates, pdf=True)
+    print(f"wrote {len(names)} returns of ~{args.pages} pages to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Headless batch run: extract every PDF in a folder and write one workbook per PAN.
+
+    python cli.py INPUT_DIR --config config/ITR1_header.json --output OUT_DIR [--workers 4]
+    python cli.py INPUT_DIR --config auto --output OUT_DIR   # mixed ITR1/ITR2/ITR3 folder
+
+Progress is checkpointed in OUT_DIR/.itr_state: manifest.jsonl records each file's
+hash, status, timing and error, spill/ holds each return's section frames (per PAN)
+and results/ a small index entry per finished file. Rerunning the
+same command after a crash or kill skips files already done (same content, same
+config) and only processes the rest. Only PAN workbooks whose inputs changed (new,
+changed or removed returns, or a new config) are rewritten; exports.json holds the
+fingerprint behind each workbook. run_report.json (per file and stage) and
+metrics.prom (Prometheus text format) hold the timings of the last run.
+With --config auto each PDF is routed by the form type on its first page to the
+<FORM>_header.json in --config-dir.
+"""
+import argparse
+import os
+import sys
+import time
+
+from modules.ITR1 import DEBUG_OFF, ITR1BatchProcessor
+from modules.checkpoint import DONE, FAILED, BatchManifest, ExportState, ResultStore, pan_fingerprint
+from modules.config_registry import ConfigError
+from modules.extract_cache import ExtractionCache, file_sha256
+from modules.form_sniffer import FormRouter
+
+STATE_DIR = ".itr_state"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input_dir", help="folder of ITR PDFs")
+    parser.add_argument("--config", required=True,
+                        help="section config (e.g. config/ITR1_header.json), or 'auto' to route by form type")
+    parser.add_argument("--config-dir", default="config", help="configs for --config auto")
+    parser.add_argument("--fallback-config", default=None,
+                        help="with --config auto: section config for PDFs whose form is not recognised")
+    parser.add_argument("--output", required=True, help="folder for the PAN workbooks and the checkpoint state")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: serial)")
+    parser.add_argument("--page-workers", type=int, default=None,
+                        help="processes per PDF, each extracting a page range (long ITR2/ITR3 returns)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds one PDF may take before its worker is killed")
+    parser.add_argument("--max-rss-mb", type=float, default=None,
+                        help="memory (MB) one PDF's worker may use before it is killed")
+    parser.add_argument("--profile", metavar="PDF", default=None,
+                        help="cProfile one PDF of the batch (written to .itr_state/<PDF>.prof)")
+    parser.add_argument("--cache-dir", default=None, help="reuse extracted rows across runs (ExtractionCache)")
+    parser.add_argument("--prefilter", action="store_true",
+                        help="only run table extraction on pages whose text can hold a configured section")
+    parser.add_argument("--retry-failed", action="store_true", help="process files that failed last time again")
+    parser.add_argument("--dump-text", action="store_true", help="write <name>_extracted.txt next to each PDF")
+    parser.add_argument("--no-export", action="store_true", help="only process and checkpoint, skip the workbooks")
+    parser.add_argument("--force-export", action="store_true", help="rewrite every PAN workbook, changed or not")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    state_dir = os.path.join(args.output, STATE_DIR)
+    try:
+        router = FormRouter(args.config_dir, args.fallback_config) if args.config == "auto" else None
+        config_path = None if router else args.config
+        # Frames are spilled to disk as files finish, so memory does not grow with the batch
+        processor = ITR1BatchProcessor(args.input_dir, config_path,
+                                       cache=ExtractionCache(args.cache_dir) if args.cache_dir else None,
+                                       debug=DEBUG_OFF, dump_text=args.dump_text,
+                                       spill_dir=os.path.join(state_dir, "spill"), prefilter=args.prefilter,
+                                       page_workers=args.page_workers, timeout=args.timeout,
+                                       max_rss_mb=args.max_rss_mb,
+                                       profile={args.profile: os.path.join(state_dir, args.profile + ".prof")}
+                                       if args.profile else None, router=router)
+    except (OSError, ConfigError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    digest = processor.config_digest
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest = BatchManifest(os.path.join(state_dir, "manifest.jsonl"))
+    store = ResultStore(os.path.join(state_dir, "results"))
+
+    pdfs = sorted(f for f in os.listdir(args.input_dir) if f.lower().endswith(".pdf"))
+    hashes, stats = {}, {}
+    for pdf in pdfs:
+        st = os.stat(os.path.join(args.input_dir, pdf))
+        stats[pdf] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        rec = manifest.records.get(pdf)
+        # Same size + mtime as when it was recorded: trust the recorded hash
+        if rec and all(rec.get(k) == v for k, v in stats[pdf].items()):
+            hashes[pdf] = rec["sha256"]
+        else:
+            hashes[pdf] = file_sha256(os.path.join(args.input_dir, pdf))
+
+    pending, skipped = [], 0
+    for pdf in pdfs:
+        rec = manifest.get(pdf, hashes[pdf], digest)
+        if rec and rec["status"] == DONE and store.exists(hashes[pdf], digest):
+            skipped += 1
+        elif rec and rec["status"] == FAILED and not args.retry_failed:
+            skipped += 1
+        else:
+            pending.append(pdf)
+    print(f"{len(pdfs)} PDFs: {skipped} already checkpointed, {len(pending)} to process")
+
+    last = [time.perf_counter()]
+
+    # Called after every file, so a kill loses at most the files still in flight
+    def checkpoint(n, total, pdf):
+        now = time.perf_counter()
+        itr = processor.by_file.pop(pdf, None)
+        if itr is not None:
+            processor.results.pop(itr.ack or pdf, None)
+            store.save(hashes[pdf], digest, itr)
+            growth = itr.timer.rss_growth_mb if itr.timer else None
+            manifest.record(pdf, hashes[pdf], digest, DONE, itr.elapsed, ack=itr.ack, pan=itr.pan,
+                            rss_growth_mb=None if growth is None else round(growth, 1), **stats[pdf])
+            print(f"[{n}/{total}] ✅ {pdf} ({itr.elapsed:.2f}s"
+                  + (f", +{growth:.0f} MB RSS)" if growth is not None else ")"))
+        else:
+            error = processor.errors.get(pdf)
+            manifest.record(pdf, hashes[pdf], digest, FAILED, now - last[0], error=error, **stats[pdf])
+            print(f"[{n}/{total}] ❌ {pdf}: {error}")
+        last[0] = now
+
+    if pending:
+        processor.process_all(workers=args.workers, progress=checkpoint, files=pending)
+
+    failed = sorted(pdf for pdf in pdfs
+                    if (manifest.get(pdf, hashes[pdf], digest) or {}).get("status") == FAILED)
+    # The store holds spilled stubs; the export reads frames back one PAN at a time
+    if not args.no_export:
+        export = ITR1BatchProcessor(args.input_dir, config_path, debug=DEBUG_OFF, router=router)
+        for pdf in pdfs:
+            rec = manifest.get(pdf, hashes[pdf], digest)
+            if rec and rec["status"] == DONE and store.exists(hashes[pdf], digest):
+                export.add_result(pdf, store.load(hashes[pdf], digest))
+        export_state = ExportState(os.path.join(state_dir, "exports.json"))
+        members = {}
+        for pdf, itr in export.by_file.items():
+            if itr.pan is not None and export.results.get(itr.ack or pdf) is itr:
+                members.setdefault(itr.pan, []).append((itr.ack, hashes[pdf]))
+        fingerprints = {pan: pan_fingerprint(m, digest) for pan, m in members.items()}
+
+        dirty = sorted(fingerprints) if args.force_export else export_state.dirty(fingerprints, args.output)
+        print(f"{len(fingerprints)} PAN workbooks: {len(dirty)} to write, {len(fingerprints) - len(dirty)} unchanged")
+        if dirty:
+            export.export_by_pan(args.output, workers=args.workers, pans=dirty)
+            export_state.mark({pan: fingerprints[pan] for pan in dirty})
+        processor.report.batch.merge(export.report.batch)
+
+    # Files checkpointed by an earlier run are not in this run's report
+    processor.report.write_json(os.path.join(state_dir, "run_report.json"))
+    processor.report.write_metrics(os.path.join(state_dir, "metrics.prom"))
+
+    print(f"Done: {len(pdfs) - len(failed)} ok, {len(failed)} failed "
+          f"(manifest: {manifest.path})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,86 @@
-from modules.process_pdf import process_pdf
-from modules.helper import clean_and_prepend_none,apply_dynamic_headers,is_empty_row_specific,clean_row
+from modules.process_pdf import iter_cached_pdf_rows
+from modules.helper import clean_and_prepend_none,apply_dynamic_headers,apply_amount_columns,clean_row
+from modules.config_registry import REGISTRY, StartScanner, compile_patterns, load_config
+from modules.xlsx_export import write_sections, section_col_width
+from modules.spill import SpillStore
+from modules.page_filter import PageFilter
+from modules.section_state import SectionState
+from modules.isolation import IsolatedRunner
+from modules.metrics import RunReport, StageTimer
+from modules.row_store import RowStore, row_text
 import pandas as pd
-import json,re,os
+import io,re,os,time,zipfile,cProfile
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+# Debug levels
+#   off  - keep only the final section frames (production batches)
+#   log  - plus metadata / section ranges and a bounded extract_sections_log
+#   full - plus raw rows, config and copies of cleaned + final frames
+DEBUG_OFF, DEBUG_LOG, DEBUG_FULL = "off", "log", "full"
+DEBUG_LEVELS = (DEBUG_OFF, DEBUG_LOG, DEBUG_FULL)
+LOG_MAX_BYTES = 1 << 20
+
+# Return metadata (see ITR1Sections.extract_metadata)
+ACK_PATTERN = re.compile(
+    r"Acknowledgement Number\s*:\s*(\d+).*?Date of Filing\s*:\s*([\w\-]+)",
+    re.I | re.S,
+)
+# PAN_PATTERN = re.compile(r"\(A1\)\s*PAN\s+(.+?)\s*\(A2\)", re.I | re.S)
+PAN_PATTERN = re.compile(r"PAN\s*([A-Z0-9]{10})", re.I)
+
+
+class BoundedLog:
+    """
+    Ring buffer for extract_sections_log events capped by (approximate) memory;
+    the oldest events are dropped first and counted in `dropped`.
+    """
+
+    EVENT_OVERHEAD = 200  # dict + keys, roughly
+
+    def __init__(self, max_bytes=LOG_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.events = deque()
+        self.nbytes = 0
+        self.dropped = 0
+
+    def _size(self, event):
+        return self.EVENT_OVERHEAD + len(event.get("text") or "")
+
+    def append(self, event):
+        self.events.append(event)
+        self.nbytes += self._size(event)
+        while self.nbytes > self.max_bytes and len(self.events) > 1:
+            self.nbytes -= self._size(self.events.popleft())
+            self.dropped += 1
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
 
 class PDFPipeline:
-    def __init__(self, input_file, output_file, config_path):
-        self.input_file = input_file
+    # Patterns whose pages the prefilter must extract besides the section starts
+    PREFILTER_KEEP = ()
+    # False: self.extracted holds every row once __init__ returns. Subclasses that
+    # pull rows through iter_rows() and call stop_extraction() set it to True
+    LAZY_EXTRACTION = False
+
+    def __init__(self, input_file, output_file, config_path, cache=None, debug=DEBUG_FULL,
+                 log_max_bytes=LOG_MAX_BYTES, prefilter=False, page_workers=None):
+        if debug not in DEBUG_LEVELS:
+            raise ValueError(f"debug must be one of {DEBUG_LEVELS}, got {debug!r}")
+        self.started = time.perf_counter()
+        self.elapsed = None  # seconds, set once the pipeline has finished
+        self.timer = StageTimer()  # per-stage wall time, pages / rows, peak RSS
+        self.form = self.ay = None  # set when a FormRouter picked the config from page 1
+        # Uploaded bytes / buffers are not kept on the object once extraction is done
+        self.input_file = input_file if isinstance(input_file, (str, os.PathLike)) else None
         self.output_file = output_file
-        self.config_path = config_path
+        self.debug_level = debug
 
         # Central debug store
         self.debug = {
@@ -18,80 +91,175 @@ class PDFPipeline:
             "section_ranges": None,
             "cleaned_sections": {},
             "final_dataframes": {},
-            "extract_sections_log": [],
+            "extract_sections_log": BoundedLog(log_max_bytes) if debug != DEBUG_OFF else None,
+            "skipped_pages": None,
         }
 
-        # Load config
-        with open(config_path, encoding="utf-8") as f:
-            self.config = json.load(f)
-        self.debug["config"] = self.config
-
-        # Extract PDF
-        self.extracted = process_pdf(input_file, output_file)
-        self.debug["raw_extracted"] = self.extracted
-
-    def save_debug(self, key, value):
-        self.debug[key] = value
+        # Load config (compiled once per process, shared across the batch)
+        self.compiled = load_config(config_path)
+        self.config_path = self.compiled.path
+        self.config = self.compiled.raw
+
+        # prefilter: only run extract_table on pages whose text can hold a section
+        # (or metadata); row indices refer to the extracted rows either way
+        self.page_filter = PageFilter(self.compiled, keep=self.PREFILTER_KEEP) if prefilter else None
+
+        # Extract PDF page by page (cache hit skips pdfplumber entirely)
+        self.extracted = RowStore()  # interned cells + cached row text, sliced without copies
+        # page_workers: extract page ranges of this one PDF across processes (large
+        # returns); the prefilter needs pages in order, so it takes precedence.
+        # RSS is sampled after every page: timer.rss_growth_mb is what this document
+        # added over the RSS at its start (timer.peak_rss_mb is the process's peak)
+        # Where extraction stops depends on the pipeline and its config, so rows cached
+        # after an early stop are only reused by the same pair
+        self._pending = self.timer.timed("process_pdf", iter_cached_pdf_rows(
+            input_file, output_file, cache, self.page_filter, page_workers, self.timer.counts,
+            on_page=self.timer.sample_memory, stop_key=f"{type(self).__name__}:{self.compiled.digest}"))
+
+        if debug == DEBUG_FULL:
+            self.debug["config"] = self.config
+            self.debug["raw_extracted"] = self.extracted
+        if not self.LAZY_EXTRACTION:
+            for _ in self.iter_rows():
+                pass
+            self.stop_extraction()
+
+    # Pickle the config by path (re-resolved through the registry), not its contents
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["compiled"] = os.path.abspath(self.compiled.path)
+        state["config"] = None
+        state["_pending"] = None
+        state["page_filter"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.compiled = load_config(state["compiled"])
+        self.config = self.compiled.raw
+        self._pending = iter(())
+
+    def save_debug(self, key, value, level=DEBUG_LOG):
+        if DEBUG_LEVELS.index(self.debug_level) >= DEBUG_LEVELS.index(level):
+            self.debug[key] = value
+
+    def log_event(self, row, section, event, text=None):
+        log = self.debug.get("extract_sections_log")
+        if log is None:
+            return
+        entry = {"row": row, "section": section, "event": event}
+        if text is not None:
+            entry["text"] = text
+        log.append(entry)
+
+    def iter_rows(self):
+        # Replays rows already extracted, then pulls further pages on demand
+        idx = 0
+        while True:
+            if idx == len(self.extracted):
+                row = next(self._pending, None)
+                if row is None:
+                    return
+                self.extracted.append(row)
+                yield row
+            else:
+                yield self.extracted[idx]
+            idx += 1
+
+    def row_text(self, idx):
+        # Joined text of extracted row idx, computed once when it was stored
+        return self.extracted.texts[idx]
+
+    def stop_extraction(self):
+        # Closes the PDF; remaining pages are never opened, with or without a cache
+        with self.timer.stage("process_pdf"):
+            self._pending.close()
+        self._pending = iter(())
+        if self.page_filter is not None:
+            self.save_debug("skipped_pages", list(self.page_filter.skipped))
 
     def slice_rows(self, start, end, indentation_skip=None):
         if indentation_skip:
             cleaned = clean_and_prepend_none(self.extracted[start:end], indentation_skip)
             return pd.DataFrame(cleaned)
-        return pd.DataFrame(self.extracted[start:end])
+        return self.extracted.frame(start, end)
 
 class ITR1Sections(PDFPipeline):
-    def __init__(self, input_file, output_file, config_path):
-        super().__init__(input_file, output_file, config_path)
-
+    PREFILTER_KEEP = (ACK_PATTERN, PAN_PATTERN)
+    # Pages after the last section are never extracted
+    LAZY_EXTRACTION = True
+
+    def __init__(self, input_file, output_file, config_path, cache=None, debug=DEBUG_FULL,
+                 log_max_bytes=LOG_MAX_BYTES, prefilter=False, page_workers=None, profile=None):
+        super().__init__(input_file, output_file, config_path, cache, debug, log_max_bytes, prefilter,
+                         page_workers)
+
+        if profile:
+            # cProfile capture of this file, written to `profile` (pstats / snakeviz)
+            profiler = cProfile.Profile()
+            profiler.runcall(self.run)
+            os.makedirs(os.path.dirname(profile) or ".", exist_ok=True)
+            profiler.dump_stats(profile)
+        else:
+            self.run()
+
+    def run(self):
         # Extract metadata
-        self.ack, self.dof, self.pan = self.extract_metadata()
+        with self.timer.stage("extract_metadata"):
+            self.ack, self.dof, self.pan = self.extract_metadata()
+        if self.page_filter is not None:
+            # Metadata found: from here on only section pages are table-extracted
+            self.page_filter.release_keep()
         self.save_debug("metadata", {"ack": self.ack, "dof": self.dof, "pan": self.pan})
         
 
         # Build patterns
         self.table_start_ptr = {k: v.get("table_start_ptr") for k, v in self.config.items()}
         self.ftr_row_map = {k: v.get("ftr_row_map") for k, v in self.config.items()}
-        self.hdr_map = {k: v.get("hdr_row_map") for k, v in self.config.items()}
-        self.indentation_skip = {k: v.get("indentation_skip") for k, v in self.config.items()}
+        self.hdr_map = self.compiled.hdr_row_map
+        self.indentation_skip = self.compiled.indentation_skip
 
         self.save_debug("patterns", {
             "start": self.table_start_ptr,
             "end": self.ftr_row_map,
             "hdr_map": self.hdr_map,
             "indentation_skip": self.indentation_skip,
-        })
-
-        # Extract sections WITH DEBUG
-        self.sections = self.extract_sections(
-            self.extracted,
-            self.table_start_ptr,
-            self.ftr_row_map,
-            self.hdr_map
-        )
+        }, level=DEBUG_FULL)
+
+        # Extract sections WITH DEBUG (stops early once every section is complete)
+        with self.timer.stage("extract_sections"):
+            self.sections = self.extract_sections(
+                self.iter_rows(),
+                self.compiled.start_scanner,
+                self.compiled.end_patterns,
+                self.hdr_map,
+                texts=self.extracted.texts,
+            )
+        self.stop_extraction()
+        self.timer.count("rows", len(self.extracted))
         self.save_debug("section_ranges", self.sections)
 
         # Build DataFrames
         self.dataframes = self.build_all_sections()
 
+        # Below full debug, raw rows are only needed until the sections are built
+        if self.debug_level != DEBUG_FULL:
+            self.extracted = RowStore()
+        self.elapsed = time.perf_counter() - self.started
+
     # ---------------------------------------------------------
     # ✅ Metadata extraction
     # ---------------------------------------------------------
     def extract_metadata(self):
-        ack_pat = re.compile(
-            r"Acknowledgement Number\s*:\s*(\d+).*?Date of Filing\s*:\s*([\w\-]+)",
-            re.I | re.S,
-        )
-        # pan_pat = re.compile(r"\(A1\)\s*PAN\s+(.+?)\s*\(A2\)", re.I | re.S)
-        pan_pat = re.compile(r"PAN\s*([A-Z0-9]{10})", re.I)
         ack = dof = pan = None
 
-        for row in self.extracted:
-            text = " ".join(str(x) for x in row if x)
+        for idx, _ in enumerate(self.iter_rows()):
+            text = self.row_text(idx)
 
-            if not ack and (m := ack_pat.search(text)):
+            if not ack and (m := ACK_PATTERN.search(text)):
                 ack, dof = m.group(1).strip(), m.group(2).strip()
 
-            if not pan and (m := pan_pat.search(text)):
+            if not pan and (m := PAN_PATTERN.search(text)):
                 pan = m.group(1).strip()
 
             if ack and pan:
@@ -102,61 +270,23 @@ class ITR1Sections(PDFPipeline):
     # ---------------------------------------------------------
     # ✅ Section extraction with FULL DEBUG
     # ---------------------------------------------------------
-    def extract_sections(self, data, start_pattern, end_pattern, hdr_row_map):
+    def extract_sections(self, data, start_pattern, end_pattern, hdr_row_map, texts=None):
+        # start_pattern: {section: regex} (compiled or string) or a prebuilt StartScanner
+        # end_pattern: {section: regex, compiled or string, or EMPTY_ROW_SPECIFIC}
+        # texts: precomputed row_text of each row in data (e.g. RowStore.texts)
+        scanner = start_pattern if isinstance(start_pattern, StartScanner) else StartScanner(start_pattern)
+        state = SectionState(scanner, compile_patterns(end_pattern), hdr_row_map, log=self.log_event)
         sections = {}
-        current_section = None
-        start_index = None
-        total_row = len(data)
+        expected = set(scanner.sections)
 
         for idx, row in enumerate(data):
-            row_str = " ".join(str(x) for x in row if x)
-
-            # --- Start Pattern ---
-            for sec, pat in start_pattern.items():
-                if pat and re.search(pat, row_str, re.IGNORECASE):
-                    self.debug["extract_sections_log"].append(
-                        {"row": idx, "section": sec, "event": "start_match", "text": row_str}
-                    )
-                    current_section = sec
-                    start_index = None
+            closed = state.feed(idx, row, texts[idx] if texts is not None else row_text(row))
+            if closed:
+                name, start, end = closed
+                sections[name] = {"start": start, "end": end}
+                if expected <= sections.keys():
                     break
 
-            # --- Header Row ---
-            if current_section and not start_index:
-                hdrs = hdr_row_map.get(current_section, [])
-                if row and row[0] != "" and any(h in row for h in hdrs):
-                    start_index = idx
-                    self.debug["extract_sections_log"].append(
-                        {"row": idx, "section": current_section, "event": "header_match", "text": row_str}
-                    )
-                    continue
-
-            # --- End Pattern ---
-            if current_section and start_index:
-                end_pat = end_pattern.get(current_section)
-                is_end = False
-
-                if end_pat and end_pat not in ["", "<empty_row_specific>"]:
-                    if re.search(end_pat, row_str, re.IGNORECASE):
-                        is_end = True
-                        self.debug["extract_sections_log"].append(
-                            {"row": idx, "section": current_section, "event": "end_match", "text": row_str}
-                        )
-
-                if end_pat == "<empty_row_specific>" and is_empty_row_specific(row):
-                    is_end = True
-                    self.debug["extract_sections_log"].append(
-                        {"row": idx, "section": current_section, "event": "empty_row_match", "text": row_str}
-                    )
-
-                if is_end:
-                    sections[current_section] = {"start": start_index, "end": idx + 1}
-                    self.debug["extract_sections_log"].append(
-                        {"row": idx, "section": current_section, "event": "section_completed"}
-                    )
-                    current_section = None
-                    start_index = None
-
         return sections
 
     # ---------------------------------------------------------
@@ -170,15 +300,22 @@ class ITR1Sections(PDFPipeline):
             start, end = meta["start"], meta["end"]
             indent = self.indentation_skip.get(name)
 
-            df_raw = self.slice_rows(start, end, indent)
-            df_clean = clean_row(df_raw)
-            self.debug["cleaned_sections"][name] = df_clean.copy()
+            with self.timer.stage("slice_rows"):
+                df_raw = self.slice_rows(start, end, indent)
+            with self.timer.stage("clean_row"):
+                df_clean = clean_row(df_raw)
+            if self.debug_level == DEBUG_FULL:
+                self.debug["cleaned_sections"][name] = df_clean.copy()
 
-            df_final = apply_dynamic_headers(df_clean, self.config, name)
-            df_final = self.add_headers(df_final, [name] + hdr)
+            with self.timer.stage("apply_dynamic_headers"):
+                df_final = apply_dynamic_headers(df_clean, self.config, name)
+            with self.timer.stage("finalize_frames"):
+                df_final = apply_amount_columns(df_final, self.config, name)
+                df_final = self.add_headers(df_final, [name] + hdr)
 
             dfs[name] = df_final
-            self.debug["final_dataframes"][name] = df_final.copy()
+            if self.debug_level == DEBUG_FULL:
+                self.debug["final_dataframes"][name] = df_final.copy()
 
         return dfs
 
@@ -202,43 +339,190 @@ class ITR1Sections(PDFPipeline):
     # ✅ Single-file Excel export
     # ---------------------------------------------------------
     def export_to_excel(self, output_file):
-        with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
-            for name, df in self.dataframes.items():
-                df.to_excel(writer, sheet_name=name, index=False)
-                ws = writer.sheets[name]
-                for col in range(len(df.columns)):
-                        max_len = max(len(str(x)) for x in df[col])
-                        ws.set_column(col, col, max(max_len + 2,60))    
+        sheets = [(name, [df]) for name, df in self.dataframes.items()]
+        write_sections(output_file, sheets, separator=False, col_width=section_col_width)
 
     def debug_viewer(self):
-        return ExtractionDebugViewer(self.debug.get("extract_sections_log", []))
-    
+        return ExtractionDebugViewer(self.debug.get("extract_sections_log") or [])
+
+    # ---------------------------------------------------------
+    # ✅ Drop raw rows + debug copies (keep what export needs)
+    # ---------------------------------------------------------
+    def slim(self):
+        self.extracted = RowStore()
+        self.debug = {
+            "metadata": self.debug.get("metadata", {}),
+            "section_ranges": self.sections,
+            "skipped_pages": self.debug.get("skipped_pages"),
+            "extract_sections_log": self.debug.get("extract_sections_log"),
+        }
+        return self
+
+
+def _sections(input_file, output_file, config, cache=None, debug=DEBUG_OFF, options=None, router=None):
+    # router: pick the section config from the PDF's first page instead of `config`
+    form = ay = None
+    if router is not None:
+        config, form, ay = router.route(input_file)
+    itr = ITR1Sections(input_file, output_file, config, cache, debug, **(options or {}))
+    itr.form, itr.ay = form, ay
+    return itr
+
+
+def _build_sections(input_file, output_file, config_path, cache=None, debug=DEBUG_OFF, options=None, router=None):
+    # Runs inside a worker process; only the slim object is pickled back
+    return _sections(input_file, output_file, config_path, cache, debug, options, router).slim()
+
+
 class ITR1BatchProcessor:
-    def __init__(self, pdf_dir: str, config_path: str):
-        self.pdf_dir = pdf_dir
+    def __init__(self, pdf_dir: str, config_path: str, cache=None, debug=DEBUG_FULL, dump_text=True,
+                 spill_dir=None, prefilter=False, page_workers=None, timeout=None, max_rss_mb=None,
+                 profile=None, router=None):
+        self.pdf_dir = pdf_dir  # may be None when only process_buffers is used
+        # router (FormRouter): each PDF gets the section config of its form (mixed
+        # ITR1/ITR2 batches); config_path may then be None
+        self.router = router
         self.config_path = config_path
+        # invalid configs fail here, not per PDF
+        self.config = load_config(config_path) if config_path or router is None else None
+        self.config_digest = router.digest if router else self.config.digest
+        self.cache = cache  # optional ExtractionCache shared by all files
+        self.debug = debug  # DEBUG_OFF for production runs: only final frames are kept
+        self.dump_text = dump_text  # write <name>_extracted.txt next to each PDF
+        # spill_dir: keep section frames on disk (per PAN) instead of in memory, so
+        # memory stays flat with batch size; export reads back one PAN at a time
+        self.spill = SpillStore(spill_dir) if spill_dir else None
+        self.prefilter = prefilter  # skip extract_table on pages without a configured section
+        # page_workers: processes per PDF for page-range extraction; with file workers
+        # too, up to workers * page_workers processes extract at once
+        self.page_workers = page_workers
+        # Per-file budgets: with either set, every PDF runs in its own process, which is
+        # killed (and recorded in errors) once it runs > timeout s or grows > max_rss_mb
+        self.timeout = timeout
+        self.max_rss_mb = max_rss_mb
+        self.profile = profile or {}  # {PDF name: .prof path} for cProfile capture
+        self.report = RunReport()  # per-file / per-stage timings of this batch
         self.results = {}  # ack → ITR1Sections object
         self.errors = {}  # filename → error message
+        self.by_file = {}  # filename → ITR1Sections object
 
     # ---------------------------------------------------------
     # ✅ Process all PDFs in directory
     # ---------------------------------------------------------
-    def process_all(self):
-        pdfs = [f for f in os.listdir(self.pdf_dir) if f.lower().endswith(".pdf")]
-
+    def process_all(self, workers=None, progress=None, files=None):
+        # files: optional subset of PDF names in pdf_dir (e.g. the ones not yet checkpointed)
+        pdfs = files if files is not None else [f for f in os.listdir(self.pdf_dir) if f.lower().endswith(".pdf")]
+        jobs = []
         for pdf in pdfs:
             input_file = os.path.join(self.pdf_dir, pdf)
-            output_file = input_file.replace(".pdf", "_extracted.txt")
+            output_file = input_file.replace(".pdf", "_extracted.txt") if self.dump_text else None
+            jobs.append((pdf, input_file, output_file))
+        return self._process_jobs(jobs, workers, progress)
 
+    # ---------------------------------------------------------
+    # ✅ Process in-memory PDFs (e.g. Streamlit uploads): {name: bytes}
+    # ---------------------------------------------------------
+    def process_buffers(self, buffers, workers=None, progress=None):
+        jobs = [(name, data, None) for name, data in buffers.items()]
+        return self._process_jobs(jobs, workers, progress)
+
+    # progress(done, total, filename) is called after every file, ok or failed
+    def _process_jobs(self, jobs, workers, progress=None):
+        if self.timeout is not None or self.max_rss_mb is not None:
+            return self._process_isolated(jobs, workers, progress)
+        if workers and workers > 1 and len(jobs) > 1:
+            return self._process_parallel(jobs, workers, progress)
+
+        for n, (pdf, input_file, output_file) in enumerate(jobs, start=1):
             try:
-                itr = ITR1Sections(input_file, output_file, self.config_path)
-                key = itr.ack or pdf
-                self.results[key] = itr
+                itr = _sections(input_file, output_file, self.config, self.cache, self.debug,
+                                self._options(pdf), self.router)
+                self.add_result(pdf, itr)
             except Exception as e:
-                self.errors[pdf] = str(e)
+                self.add_error(pdf, str(e))
+            if progress:
+                progress(n, len(jobs), pdf)
 
         return self.results
 
+    # ---------------------------------------------------------
+    # ✅ Process pool: results collected in listing order
+    # ---------------------------------------------------------
+    def _process_parallel(self, jobs, workers, progress=None):
+        # Full debug copies are not worth pickling back; workers keep at most the log
+        debug = DEBUG_OFF if self.debug == DEBUG_OFF else DEBUG_LOG
+        pending = iter(jobs)
+        in_flight = deque()
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(jobs)),
+            initializer=REGISTRY.register if self.config else None,
+            initargs=(self.config,) if self.config else (),
+        ) as pool:
+            for n in range(1, len(jobs) + 1):
+                # At most 2 jobs per worker in flight: finished frames wait in their
+                # future only until the slowest earlier file is done, then get spilled
+                for pdf, input_file, output_file in islice(pending, 2 * workers - len(in_flight)):
+                    in_flight.append((pdf, pool.submit(_build_sections, input_file, output_file, self.config_path,
+                                                       self.cache, debug, self._options(pdf), self.router)))
+                pdf = self._collect(*in_flight.popleft())
+                if progress:
+                    progress(n, len(jobs), pdf)
+
+        return self.results
+
+    def _collect(self, pdf, fut):
+        # The future (and its pickled-back frames) is dropped once this returns
+        try:
+            self.add_result(pdf, fut.result())
+        except Exception as e:
+            self.add_error(pdf, str(e))
+        return pdf
+
+    # ---------------------------------------------------------
+    # ✅ One process per PDF with time / memory budgets
+    # ---------------------------------------------------------
+    def _process_isolated(self, jobs, workers, progress=None):
+        debug = DEBUG_OFF if self.debug == DEBUG_OFF else DEBUG_LOG
+        runner = IsolatedRunner(_build_sections, workers, self.timeout, self.max_rss_mb)
+        tasks = [
+            (i, (input_file, output_file, self.config_path, self.cache, debug, self._options(pdf), self.router))
+            for i, (pdf, input_file, output_file) in enumerate(jobs)
+        ]
+        # Files finish in any order but are applied in listing order, like the other
+        # paths, so a duplicate acknowledgement resolves the same way
+        finished = {}
+        applied = 0
+        for n, (i, ok, value) in enumerate(runner.run(tasks), start=1):
+            finished[i] = (ok, value)
+            while applied in finished:
+                ok, value = finished.pop(applied)
+                if ok:
+                    self.add_result(jobs[applied][0], value)
+                else:
+                    self.add_error(jobs[applied][0], value)
+                applied += 1
+            if progress:
+                progress(n, len(tasks), jobs[i][0])
+
+        return self.results
+
+    def _options(self, pdf):
+        # Per-file ITR1Sections keyword options (picklable, for worker processes)
+        return {"prefilter": self.prefilter, "page_workers": self.page_workers, "profile": self.profile.get(pdf)}
+
+    def add_error(self, pdf, message):
+        self.errors[pdf] = message
+        self.report.add(pdf, error=message)
+
+    def add_result(self, pdf, itr, cached=False):
+        # cached: a result reused from an earlier run (not timed again in the report)
+        self.report.add(pdf, itr, cached=cached)
+        if self.spill is not None:
+            itr = self.spill.put(itr, pdf)
+        key = itr.ack or pdf
+        self.results[key] = itr
+        self.by_file[pdf] = itr
+
     # ---------------------------------------------------------
     # ✅ Clean metadata DataFrame (no nested dicts)
     # ---------------------------------------------------------
@@ -254,6 +538,8 @@ class ITR1BatchProcessor:
                     "itr_obj": itr,  # ✅ store object, not dict
                 }
             )
+            if self.router:
+                rows[-1].update(form=getattr(itr, "form", None), ay=getattr(itr, "ay", None))
         df = pd.DataFrame(rows)
         df["dof"] = pd.to_datetime(df["dof"], errors="coerce", dayfirst=True).dt.date
         df = df.sort_values(by=["pan", "dof"], ascending=[True, True])
@@ -262,48 +548,112 @@ class ITR1BatchProcessor:
     # ---------------------------------------------------------
     # ✅ Export grouped Excel by PAN
     # ---------------------------------------------------------
-    def export_by_pan(self, output_dir=None):
+    def export_by_pan(self, output_dir=None, workers=None, pans=None):
+        # pans: optional subset of PANs to (re)write; the rest are left alone
         if output_dir is None:
             output_dir = self.pdf_dir
 
-        df = self.metadata()
+        with self.report.batch.stage("export_by_pan"):
+            # Lazy: only the PANs being written have their frames loaded
+            jobs = (
+                (os.path.join(output_dir, f"{pan}.xlsx"), sheets)
+                for pan, sheets in self.iter_by_pan(pans)
+            )
+
+            # PAN workbooks are independent: write them across a process pool
+            n_pans = self.pan_count(pans)
+            if workers and workers > 1 and n_pans > 1:
+                with ProcessPoolExecutor(max_workers=min(workers, n_pans)) as pool:
+                    for output_file in _bounded_map(pool, _write_pan_workbook, jobs, 2 * workers):
+                        print(f"✅ Exported {output_file}")
+                return
 
-        with open(self.config_path, encoding="utf-8") as f:
-            config = json.load(f)
+            for output_file, sheets in jobs:
+                _write_pan_workbook(output_file, sheets)
+                print(f"✅ Exported {output_file}")
+
+    # ---------------------------------------------------------
+    # ✅ Export grouped Excel by PAN straight into a ZIP (no files on disk)
+    # ---------------------------------------------------------
+    def export_zip(self, zip_target, workers=None):
+        """
+        zip_target: path or writable binary buffer. Each {pan}.xlsx is streamed
+        directly into its ZIP entry. Returns the number of workbooks written.
+        """
+        with self.report.batch.stage("export_zip"):
+            count = 0
+            n_pans = self.pan_count()
+            with zipfile.ZipFile(zip_target, "w", zipfile.ZIP_DEFLATED) as zf:
+                if workers and workers > 1 and n_pans > 1:
+                    with ProcessPoolExecutor(max_workers=min(workers, n_pans)) as pool:
+                        pan_jobs = _bounded_map(pool, _pan_workbook_bytes, self.iter_by_pan(), 2 * workers)
+                        for pan, data in pan_jobs:
+                            zf.writestr(f"{pan}.xlsx", data)
+                            count += 1
+                else:
+                    for pan, sheets in self.iter_by_pan():
+                        with zf.open(f"{pan}.xlsx", "w") as entry:
+                            write_sections(entry, sheets)
+                        count += 1
+            return count
+
+    # ---------------------------------------------------------
+    # ✅ One pass over results: PAN → [(section, frames)]
+    # ---------------------------------------------------------
+    def collect_by_pan(self):
+        return list(self.iter_by_pan())
+
+    def pan_count(self, pans=None):
+        # Same PANs iter_by_pan yields (groupby drops a missing PAN)
+        found = {itr.pan for itr in self.results.values() if itr.pan is not None}
+        return len(found if pans is None else found & set(pans))
+
+    def iter_by_pan(self, pans=None):
+        # Yields one PAN at a time, so spilled frames are read back per PAN
+        if not self.results:
+            return
+        df = self.metadata()
+        if pans is not None:
+            df = df[df["pan"].isin(list(pans))]
+        section_order = self.router.section_order() if self.router else list(self.config.raw.keys())
 
         for pan, group in df.groupby("pan"):
-            group_sorted = group.sort_values("dof")
-            output_file = os.path.join(output_dir, f"{pan}.xlsx")
+            by_section = {}
+            for itr in group.sort_values("dof")["itr_obj"]:
+                for section, frame in itr.dataframes.items():
+                    by_section.setdefault(section, []).append(frame)
+            sheets = [(section, by_section[section]) for section in section_order if section in by_section]
+            yield pan, sheets
+
 
-            with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
-                for section in config.keys():
-                    dfs = []
-                    for _, row in group_sorted.iterrows():
-                        itr = row["itr_obj"]
-                        if section in itr.dataframes:
-                            df_sec = itr.dataframes[section].copy()
-                            df_sec.loc[len(df_sec)] = [pd.NA] * len(df_sec.columns)
-                            dfs.append(df_sec)
+def _bounded_map(pool, fn, jobs, limit):
+    # pool.map submits everything up front; this keeps at most `limit` jobs (and their
+    # frames) in flight and still yields results in order
+    in_flight = deque()
+    for args in jobs:
+        in_flight.append(pool.submit(fn, *args))
+        if len(in_flight) >= limit:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
 
-                    if dfs:
-                        final_df = pd.concat(dfs, ignore_index=True)
-                        final_df.to_excel(writer, sheet_name=section, index=False)
 
-                        # Auto column width
-                        worksheet = writer.sheets[section]
-                        for idx, col in enumerate(final_df.columns):
-                            column_data_max = final_df[col].astype(str).str.len().max()
-                            max_len = max(len(str(col)), column_data_max)
-                            worksheet.set_column(idx, idx,min(max_len + 2,60))
+def _write_pan_workbook(output_file, sheets):
+    # Streams rows + tracks column widths; each return followed by a blank row
+    return write_sections(output_file, sheets)
 
-            print(f"✅ Exported {output_file}")
 
+def _pan_workbook_bytes(pan, sheets):
+    buf = io.BytesIO()
+    write_sections(buf, sheets)
+    return pan, buf.getvalue()
 
 
 class ExtractionDebugViewer:
     def __init__(self, log):
         self.log = log
-        self.df = pd.DataFrame(log) if log else pd.DataFrame(columns=["row", "section", "event", "text"])
+        self.dropped = getattr(log, "dropped", 0)  # events evicted from a BoundedLog
+        self.df = pd.DataFrame(list(log)) if log else pd.DataFrame(columns=["row", "section", "event", "text"])
 
     def show(self, max_rows=50):
         pd.set_option("display.max_colwidth", 200)
@@ -323,8 +673,12 @@ class ExtractionDebugViewer:
         return self.df[self.df["event"].isin(["start_match", "header_match"])].copy()
 
     def print(self, limit=100):
+        if self.df.empty:
+            print("No extract_sections_log captured (debug level 'off' or nothing matched).")
+        if self.dropped:
+            print(f"... {self.dropped} earlier event(s) dropped by the log size cap")
         subset = self.df.head(limit).to_dict("records")
         for row in subset:
             print(f"[{row['event']}] Row {row['row']} | Section: {row['section']}")
-            print(f"   → {str(row['text'])[:200]}")
+            print(f"   → {str(row.get('text'))[:200]}")
             print("-" * 80)
\ No newline at end of file
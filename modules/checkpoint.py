@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+
+from modules.helper import atomic_write
+
+DONE, FAILED = "done", "failed"
+
+
+class BatchManifest:
+    """
+    Append-only JSON-lines record of per-file outcomes for a batch run.
+
+    One line per finished file (name, content hash, config digest, status, seconds,
+    error, ...), flushed and fsynced before the next file starts. The last line for a
+    file wins, and a torn final line left by a crash is ignored, so a rerun sees
+    exactly the files that completed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self._torn = False  # last line has no newline: the next record must start a new one
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    self._torn = not line.endswith("\n")
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.records[rec["file"]] = rec
+
+    def get(self, name, sha256, config_digest):
+        # Only a record for the same content under the same config counts
+        rec = self.records.get(name)
+        if rec and rec["sha256"] == sha256 and rec["config"] == config_digest:
+            return rec
+        return None
+
+    def record(self, name, sha256, config_digest, status, seconds=None, error=None, **extra):
+        rec = {
+            "file": name,
+            "sha256": sha256,
+            "config": config_digest,
+            "status": status,
+            "seconds": None if seconds is None else round(seconds, 4),
+            "error": error,
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **extra,
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(("\n" if self._torn else "") + json.dumps(rec) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._torn = False
+        self.records[name] = rec
+        return rec
+
+
+class ResultStore:
+    """
+    Pickled results (ITR1Sections, or its SpilledSections stub) per (content hash,
+    config digest), so a resumed run can export files finished by an earlier run
+    without parsing them again.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+
+    def path(self, sha256, config_digest):
+        return os.path.join(self.store_dir, f"{sha256}_{config_digest[:16]}.pkl")
+
+    def exists(self, sha256, config_digest):
+        return os.path.exists(self.path(sha256, config_digest))
+
+    def save(self, sha256, config_digest, itr):
+        atomic_write(self.path(sha256, config_digest), pickle.dumps(itr, pickle.HIGHEST_PROTOCOL))
+
+    def load(self, sha256, config_digest):
+        with open(self.path(sha256, config_digest), "rb") as f:
+            return pickle.load(f)
+
+
+def pan_fingerprint(members, config_digest):
+    # members: (ack, content sha256) of every return in the PAN workbook
+    payload = json.dumps([config_digest, sorted(members)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ExportState:
+    """
+    Fingerprint of the inputs behind each written {pan}.xlsx (acks, their content
+    hashes, config digest). A PAN is dirty when its fingerprint changed or its
+    workbook is missing; only dirty PANs need rewriting.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fingerprints = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.fingerprints = json.load(f)
+
+    def dirty(self, fingerprints, output_dir):
+        return sorted(
+            pan for pan, fp in fingerprints.items()
+            if self.fingerprints.get(pan) != fp
+            or not os.path.exists(os.path.join(output_dir, f"{pan}.xlsx"))
+        )
+
+    def mark(self, fingerprints):
+        self.fingerprints.update(fingerprints)
+        atomic_write(self.path, json.dumps(self.fingerprints, indent=1, sort_keys=True).encode())
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict
+
+try:
+    from re import _constants, _parser
+except ImportError:  # Python < 3.11
+    import sre_constants as _constants
+    import sre_parse as _parser
+
+EMPTY_ROW_SPECIFIC = "<empty_row_specific>"
+FIELD_TYPES = ("STRING", "NUMERIC")
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _strip_pattern(pat):
+    # Same normalisation extract_data has always applied to line-config patterns
+    return (pat or "").strip().strip("r'").strip("'")
+
+
+def _compile(path, entry, key, pat, flags=re.IGNORECASE):
+    try:
+        return re.compile(pat, flags)
+    except re.error as e:
+        raise ConfigError(f"{path}: {entry}.{key} is not a valid regex ({e})") from None
+
+
+def compile_patterns(patterns: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    {section: pattern} with plain-string regexes compiled (case-insensitive, as the
+    config loader does). Compiled patterns, EMPTY_ROW_SPECIFIC and empty values pass
+    through, so callers may hand in raw config strings (e.g. notebooks).
+    """
+    return {
+        sec: re.compile(pat, re.IGNORECASE) if isinstance(pat, str) and pat and pat != EMPTY_ROW_SPECIFIC else pat
+        for sec, pat in patterns.items()
+    }
+
+
+def _require(path, entry, cond, msg):
+    if not cond:
+        raise ConfigError(f"{path}: {entry}: {msg}")
+
+
+def _is_str_list(value):
+    return isinstance(value, list) and all(isinstance(x, str) for x in value)
+
+
+def _longest_literal(items):
+    runs, cur = [], []
+    for op, av in items:
+        if op is _constants.LITERAL and av < 128:
+            cur.append(chr(av))
+        elif cur:
+            runs.append("".join(cur))
+            cur = []
+    if cur:
+        runs.append("".join(cur))
+    return max(runs, key=len).lower() if runs else None
+
+
+def required_literal(pattern):
+    """
+    Longest run of plain ASCII characters that every match of `pattern` must contain,
+    lower-cased, or None. Only top-level literals count; groups, classes, repeats and
+    alternations end a run.
+    """
+    return _longest_literal(_parser.parse(pattern.pattern, pattern.flags))
+
+
+def required_literals(pattern):
+    """
+    Like required_literal, but a pattern that is one alternation (optionally anchored
+    and/or grouped, e.g. ^(SCHEDULE TCS|SCH TCS)) gives one literal per branch: every
+    match contains at least one of them. None when some branch has no literal.
+    """
+    items = [(op, av) for op, av in _parser.parse(pattern.pattern, pattern.flags) if op is not _constants.AT]
+    if len(items) == 1 and items[0][0] is _constants.SUBPATTERN:
+        items = [(op, av) for op, av in items[0][1][-1] if op is not _constants.AT]
+    if len(items) == 1 and items[0][0] is _constants.BRANCH:
+        literals = [_longest_literal(branch) for branch in items[0][1][1]]
+        return None if None in literals else literals
+    literal = _longest_literal(items)
+    return [literal] if literal else None
+
+
+class StartScanner:
+    """
+    Finds the first section (in config order) whose start pattern matches a row.
+
+    Each pattern's required literal is checked with a plain substring test on the
+    lower-cased row first, so the regex only runs for the few sections that can
+    match at all. Rows with non-ASCII text skip the prefilter (case folding there is
+    not a simple lower()), which keeps results identical to the per-section loop.
+    """
+
+    def __init__(self, patterns: Dict[str, Any]):
+        self.patterns = {sec: pat for sec, pat in compile_patterns(patterns).items() if pat}
+        self.sections = list(self.patterns)
+        self._entries = [
+            (sec, pat, required_literal(pat)) for sec, pat in self.patterns.items()
+        ]
+
+    def first_match(self, text):
+        if text.isascii():
+            low = text.lower()
+            for sec, pat, lit in self._entries:
+                if (lit is None or lit in low) and pat.search(text):
+                    return sec
+            return None
+        for sec, pat in self.patterns.items():
+            if pat.search(text):
+                return sec
+        return None
+
+
+class CompiledConfig:
+    """
+    A validated config file with every regex compiled once.
+    kind == "header": section slicing config (table_start_ptr / hdr_row_map / ftr_row_map)
+    kind == "line":   field extraction config (HEADER_PATTERN / PATTERN / KEYS)
+    """
+
+    def __init__(self, path: str, raw: Dict[str, Any]):
+        self.path = path
+        self.raw = raw
+        # Content version of the config: results keyed on it survive renames / touches
+        self.digest = hashlib.sha256(json.dumps(raw, sort_keys=True).encode()).hexdigest()
+        _require(path, "<root>", isinstance(raw, dict) and raw, "config must be a non-empty JSON object")
+        for entry, spec in raw.items():
+            _require(path, entry, isinstance(spec, dict), "entry must be a JSON object")
+
+        line_entries = [e for e, spec in raw.items() if "PATTERN" in spec or "KEYS" in spec]
+        self.kind = "line" if line_entries else "header"
+        if self.kind == "line":
+            _require(path, "<root>", len(line_entries) == len(raw),
+                     "mixes line entries (PATTERN/KEYS) with section entries")
+            self._compile_line()
+        else:
+            self._compile_header()
+
+    def _compile_header(self):
+        path = self.path
+        self.start_patterns = {}
+        self.end_patterns = {}
+        self.hdr_row_map = {}
+        self.indentation_skip = {}
+        self.amount_columns = {}
+        for sec, spec in self.raw.items():
+            start = spec.get("table_start_ptr")
+            end = spec.get("ftr_row_map")
+            hdrs = spec.get("hdr_row_map", [])
+            indent = spec.get("indentation_skip")
+            table_header = spec.get("table_header", {})
+            amounts = spec.get("amount_columns", [])
+
+            _require(path, sec, start is None or isinstance(start, str), "table_start_ptr must be a string")
+            _require(path, sec, end is None or isinstance(end, str), "ftr_row_map must be a string")
+            _require(path, sec, _is_str_list(hdrs), "hdr_row_map must be a list of strings")
+            _require(path, sec, indent is None or _is_str_list(indent), "indentation_skip must be a list of strings")
+            _require(path, sec, isinstance(table_header, dict)
+                     and all(isinstance(v, str) for v in table_header.values()),
+                     "table_header must map strings to strings")
+            _require(path, sec, isinstance(amounts, list) and all(isinstance(x, (str, int)) for x in amounts),
+                     "amount_columns must be a list of column labels")
+
+            self.start_patterns[sec] = _compile(path, sec, "table_start_ptr", start) if start else None
+            if end and end != EMPTY_ROW_SPECIFIC:
+                self.end_patterns[sec] = _compile(path, sec, "ftr_row_map", end)
+            else:
+                self.end_patterns[sec] = end
+            self.hdr_row_map[sec] = hdrs
+            self.indentation_skip[sec] = indent
+            self.amount_columns[sec] = amounts
+        self.start_scanner = StartScanner(self.start_patterns)
+
+    def _compile_line(self):
+        path = self.path
+        self.fields = {}
+        for key, spec in self.raw.items():
+            keys = spec.get("KEYS", [])
+            field_type = spec.get("TYPE", "STRING")
+            row_len = spec.get("EXPECTED_ROW_LEN", 0)
+
+            _require(path, key, isinstance(spec.get("id"), str), "id must be a string")
+            _require(path, key, _is_str_list(keys), "KEYS must be a list of strings")
+            _require(path, key, field_type in FIELD_TYPES, f"TYPE must be one of {FIELD_TYPES}")
+            _require(path, key, isinstance(row_len, int), "EXPECTED_ROW_LEN must be an integer")
+            for attr in ("PATTERN", "HEADER_PATTERN"):
+                _require(path, key, isinstance(spec.get(attr, ""), str), f"{attr} must be a string")
+
+            pattern = _compile(path, key, "PATTERN", _strip_pattern(spec.get("PATTERN")))
+            _require(path, key, pattern.groups >= len(keys),
+                     f"PATTERN has {pattern.groups} group(s) for {len(keys)} KEYS")
+            self.fields[key] = {
+                "id": spec["id"],
+                "keys": keys,
+                "type": field_type,
+                "expected_row_len": row_len,
+                "header_pattern": _compile(path, key, "HEADER_PATTERN", _strip_pattern(spec.get("HEADER_PATTERN"))),
+                "pattern": pattern,
+            }
+
+        # Fields grouped by schedule (shared HEADER_PATTERN), in config order
+        by_header = {}
+        for key, field in self.fields.items():
+            if not field["keys"]:
+                continue
+            header = field["header_pattern"]
+            by_header.setdefault((header.pattern, header.flags), (header, []))[1].append(
+                (key, field["pattern"], required_literal(field["pattern"]))
+            )
+        self.schedules = list(by_header.values())
+
+
+class ConfigRegistry:
+    """
+    Loads and compiles each config once per process. Entries are keyed by path and
+    invalidated when the file changes on disk, so editing a config takes effect on
+    the next batch without restarting.
+    """
+
+    def __init__(self):
+        self._configs = {}
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, config) -> CompiledConfig:
+        if isinstance(config, CompiledConfig):
+            return config
+        path = os.path.abspath(config)
+        stamp = self._stamp(path)
+        cached = self._configs.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        with open(path, encoding="utf-8") as f:
+            try:
+                raw = json.load(f)
+            except ValueError as e:
+                raise ConfigError(f"{config}: invalid JSON ({e})") from None
+        compiled = CompiledConfig(config, raw)
+        self._configs[path] = (stamp, compiled)
+        return compiled
+
+    def register(self, compiled: CompiledConfig):
+        # Seed a worker process with a config compiled in the parent
+        path = os.path.abspath(compiled.path)
+        self._configs[path] = (self._stamp(path), compiled)
+
+
+REGISTRY = ConfigRegistry()
+
+
+def load_config(config) -> CompiledConfig:
+    return REGISTRY.get(config)
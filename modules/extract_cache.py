@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import tempfile
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def content_sha256(source, chunk_size=1 << 20):
+    # source: path, raw bytes, or a seekable binary file-like object
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    if isinstance(source, (str, os.PathLike)):
+        return file_sha256(source, chunk_size)
+    h = hashlib.sha256()
+    pos = source.tell()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(chunk_size), b""):
+        h.update(chunk)
+    source.seek(pos)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """
+    On-disk cache of process_pdf rows, keyed by PDF content hash + extraction settings.
+    Entries are JSON files; hits refresh mtime so eviction drops least recently used first.
+
+    The cache size is tracked in memory, so a put only scans the folder when the
+    limit is exceeded, or every EVICT_EVERY puts (other processes sharing the folder
+    add entries this one does not see).
+    """
+
+    EVICT_EVERY = 256
+    EVICT_TO = 0.9  # evict down to this share of max_bytes, so a full cache is not rescanned on every put
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = self._scan_size()
+        self._puts = 0
+
+    def _entries(self):
+        # (mtime, size, name) of every cache entry
+        entries = []
+        for fname in os.listdir(self.cache_dir):
+            if not fname.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, fname))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fname))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def key(self, input_file, settings):
+        h = hashlib.sha256(content_sha256(input_file).encode())
+        h.update(json.dumps(settings, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                rows = json.load(f)
+            os.utime(path)
+            return rows
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, rows):
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(rows, f, separators=(",", ":"))
+            written = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._size += written - replaced
+        self._puts += 1
+        if self._size > self.max_bytes or self._puts % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            self._size = total
+            return
+        for _, size, fname in sorted(entries):
+            if total <= self.max_bytes * self.EVICT_TO:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, fname))
+                total -= size
+            except OSError:
+                pass
+        self._size = total
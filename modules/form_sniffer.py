@@ -0,0 +1,107 @@
+import hashlib
+import io
+import os
+import re
+
+from modules.config_registry import ConfigError, load_config
+
+FORM_FIELD, AY_FIELD = "Form_Type", "Assessment_Year"
+HEADER_SUFFIX = "_header.json"
+
+
+def normalize_form(form):
+    # "ITR-2", "itr 2", "ITR2" -> "ITR2"
+    return re.sub(r"[^0-9A-Z]", "", form.upper()) if form else None
+
+
+def first_page_text(source):
+    # Text layer of page 1 only; no table extraction
+    import pdfplumber  # lazy: routing is set up long before the first PDF is read
+
+    source = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    with pdfplumber.open(source) as pdf:
+        return (pdf.pages[0].extract_text() or "") if pdf.pages else ""
+
+
+class FormRouter:
+    """
+    Routes each PDF to the section config for its form, from the first page alone.
+
+    Form type / assessment year patterns are the Form_Type / Assessment_Year fields
+    of the line configs in `config_dir` (FORM_TYPE / AY, Meta_FormType / ...);
+    section configs are the <FORM>_header.json files there. A PDF whose form is
+    not recognised, or has no section config, goes to `fallback` if one is given.
+    """
+
+    def __init__(self, config_dir="config", fallback=None):
+        self.config_dir = config_dir
+        self.fallback = load_config(fallback) if fallback else None
+        self.configs = {}  # normalised form -> CompiledConfig (section config)
+        self.form_patterns, self.ay_patterns = [], []
+        seen = set()
+        for fname in sorted(os.listdir(config_dir)):
+            if not fname.lower().endswith(".json"):
+                continue
+            path = os.path.join(config_dir, fname)
+            if fname.lower().endswith(HEADER_SUFFIX):
+                self.configs[normalize_form(fname[:-len(HEADER_SUFFIX)])] = load_config(path)
+                continue
+            compiled = load_config(path)
+            if compiled.kind != "line":
+                continue
+            for field in compiled.fields.values():
+                pat = field["pattern"]
+                target = {FORM_FIELD: self.form_patterns, AY_FIELD: self.ay_patterns}.get(field["id"])
+                if target is not None and (pat.pattern, pat.flags) not in seen:
+                    seen.add((pat.pattern, pat.flags))
+                    target.append(pat)
+        if not self.form_patterns:
+            raise ConfigError(f"{config_dir}: no line config defines a {FORM_FIELD} pattern")
+        # Changes whenever any routed config does (checkpoints / result caches key on it)
+        parts = [f"{form}={c.digest}" for form, c in sorted(self.configs.items())]
+        parts.append(f"fallback={self.fallback.digest if self.fallback else None}")
+        self.digest = hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    # Pickled as its inputs (worker processes rebuild it from the registry)
+    def __getstate__(self):
+        return {"config_dir": self.config_dir, "fallback": self.fallback.path if self.fallback else None}
+
+    def __setstate__(self, state):
+        self.__init__(state["config_dir"], state["fallback"])
+
+    @staticmethod
+    def _first(patterns, text):
+        for pat in patterns:
+            m = pat.search(text)
+            if m:
+                return m.group(1).strip()
+        return None
+
+    def sniff_text(self, text):
+        # (form, assessment year) found in a page's text, None where missing
+        form = normalize_form(self._first(self.form_patterns, text))
+        ay = self._first(self.ay_patterns, text)
+        return form, re.sub(r"\s+", "", ay) if ay else None
+
+    def sniff(self, source):
+        return self.sniff_text(first_page_text(source))
+
+    def route(self, source):
+        """
+        (compiled section config, form, ay) for a PDF path / bytes. Raises ConfigError
+        when there is no config for the form and no fallback.
+        """
+        form, ay = self.sniff(source)
+        config = self.configs.get(form, self.fallback)
+        if config is None:
+            if form is None:
+                raise ConfigError("form type not found on the first page")
+            raise ConfigError(f"{form}: no section config ({form}{HEADER_SUFFIX} in {self.config_dir})")
+        return config, form, ay
+
+    def section_order(self):
+        # Sections of every routed config, fallback first, without repeats
+        order = {}
+        for config in ([self.fallback] if self.fallback else []) + list(self.configs.values()):
+            order.update(dict.fromkeys(config.raw))
+        return list(order)
@@ -1,9 +1,24 @@
+import os
 import re
-import json
+import tempfile
 import pandas as pd
 from typing import Dict, List, Any
-from functools import reduce
 import numpy as np
+from modules.config_registry import load_config
+
+def atomic_write(path, data):
+    # Readers see the old file or the new one, never a partial write
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
 
 def clean_int(val):
     try:
@@ -11,26 +26,60 @@ def clean_int(val):
     except ValueError:
         return val
 
+# Rows mentioning any of these are page furniture, not table content
+EXCLUDED_ROW_PATTERNS = [
+    "If the return is verified after 30 days of transmission",
+    "Acknowledgement Number",
+]
+_EXCLUDED_ROWS = re.compile("|".join(f"(?:{p})" for p in EXCLUDED_ROW_PATTERNS), re.IGNORECASE)
+
+
 def clean_row(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
-    df = df.replace("", np.nan)  # Use np.nan for dropna
-    df = df.dropna(axis=1, how="all")  # drop columns full of None
-    df = df.dropna(axis=0, how="all")  # drop rows full of None
-    temp_df = df.fillna("")
-    row_content = temp_df.astype(str).agg(" ".join, axis=1)
-    patterns_to_exclude = [
-        "If the return is verified after 30 days of transmission",
-        "Acknowledgement Number",
-    ]
-    exclusion_masks = [
-        row_content.str.contains(pattern, case=False, regex=True)
-        for pattern in patterns_to_exclude
-    ]
-    combined_exclusion_mask = reduce(np.logical_or, exclusion_masks)
-    mask_to_keep = ~combined_exclusion_mask
-    df = df[mask_to_keep]
-    df = df.dropna(axis=0, how="all")
+    """
+    Strip strings, treat "" as missing, drop all-missing columns and rows, then drop
+    rows matching EXCLUDED_ROW_PATTERNS. Works on one object array with a single
+    combined regex; index labels are kept.
+    """
+    values = df.to_numpy(dtype=object)
+    flat = np.empty(values.size, dtype=object)
+    flat[:] = [(v.strip() or np.nan) if isinstance(v, str) else v for v in values.ravel()]
+    values = flat.reshape(values.shape)
+
+    missing = pd.isna(values)
+    keep_cols = ~missing.all(axis=0)
+    keep_rows = ~missing.all(axis=1)
+    values = values[keep_rows][:, keep_cols]
+    missing = missing[keep_rows][:, keep_cols]
 
+    text = np.where(missing, "", values)
+    keep = np.array([not _EXCLUDED_ROWS.search(" ".join(map(str, row))) for row in text.tolist()], dtype=bool)
+
+    # dtypes are inferred before the exclusion, as the per-cell version did
+    out = pd.DataFrame(values, index=df.index[keep_rows], columns=df.columns[keep_cols]).infer_objects()
+    return out[keep]
+
+
+def to_amounts(values: pd.Series) -> pd.Series:
+    """
+    Bulk clean_int: "1,20,000" / "5,000.00" -> Int64, <NA> where the cell is not an
+    amount (labels, "Nil", missing).
+    """
+    text = values.astype("string").str.strip().str.replace(",", "", regex=False).str.split(".").str[0]
+    text = text.where(text.str.fullmatch(r"[+-]?\d+").fillna(False).astype(bool))
+    return pd.to_numeric(text, errors="coerce").astype("Int64")
+
+
+def apply_amount_columns(df: pd.DataFrame, config: Dict[str, Any], section_name: str) -> pd.DataFrame:
+    # Optional "amount_columns" (column labels after table_header) -> int cells.
+    # Cells that are not amounts (the header row, "Nil") are left as they are. The
+    # columns stay object: add_headers stacks text rows above them, so no numeric
+    # dtype would survive into the section frame anyway.
+    columns = (config.get(section_name) or {}).get("amount_columns") or []
+    for col in columns:
+        if col not in df.columns:
+            continue
+        amounts = to_amounts(df[col])
+        df[col] = df[col].astype(object).where(amounts.isna(), amounts.astype(object))
     return df
 
 
@@ -123,50 +172,83 @@ def apply_dynamic_headers(
 #     return sections
 
 
+def _field_output(data, row, match):
+    KEYS = data["keys"]
+    field_type = data["type"]
+    if field_type == "NUMERIC" and data["expected_row_len"] == len(row):
+        num_keys = len(KEYS)
+        return {
+            key: clean_int(row[-(num_keys - i)])
+            for i, key in enumerate(KEYS)
+        }
+    if field_type == "NUMERIC":
+        return {
+            key: clean_int(match.group(i + 1).strip())
+            for i, key in enumerate(KEYS)
+        }
+    return {
+        key: match.group(i + 1).strip()
+        for i, key in enumerate(KEYS)
+    }
+
+
+def scan_fields(extracted_rows, compiled):
+    """
+    Single walk over the rows. A schedule becomes active at the first row its
+    HEADER_PATTERN matches (and stays active); only fields still pending in active
+    schedules are tried, and each field keeps its first matching row.
+    Returns {config_key: (row, match)}.
+    """
+    waiting = list(compiled.schedules)
+    active = []
+    remaining = sum(len(fields) for _, fields in waiting)
+    hits = {}
+
+    for row in extracted_rows:
+        if not remaining:
+            break
+        row_content_str = " ".join(map(str, row))
+
+        if waiting:
+            still_waiting = []
+            for header, fields in waiting:
+                if header.search(row_content_str):
+                    active.append(list(fields))
+                else:
+                    still_waiting.append((header, fields))
+            waiting = still_waiting
+        if not active:
+            continue
+
+        low = row_content_str.lower() if row_content_str.isascii() else None
+        for pending in active:
+            matched = False
+            for n, (key, pattern, literal) in enumerate(pending):
+                if low is not None and literal is not None and literal not in low:
+                    continue
+                match = pattern.search(row_content_str)
+                if match:
+                    hits[key] = (row, match)
+                    pending[n] = None
+                    remaining -= 1
+                    matched = True
+            if matched:
+                pending[:] = [entry for entry in pending if entry]
+
+    return hits
+
+
 def extract_data(extracted_rows, config_path):
-    with open(config_path, "r") as f:
-        config_data = json.load(f)
+    compiled = load_config(config_path)
+    hits = scan_fields(extracted_rows, compiled)
 
+    # Outputs built in config order, so duplicate ids and errors resolve as before
     result = {}
-    for config_key in config_data.keys():
-        data = config_data[config_key]
+    for config_key, data in compiled.fields.items():
         result[data["id"]] = {}
-        KEYS = data.get("KEYS", [])
-        if not KEYS:
-            continue
-        PATTERN = data.get("PATTERN", "").strip().strip("r'").strip("'")
-        HEADER_PATTERN = data.get("HEADER_PATTERN", "").strip().strip("r'").strip("'")
-        is_in_target_schedule = False
-        for row in extracted_rows:
-            row_content_str = " ".join(map(str, row))
-            if re.search(HEADER_PATTERN, row_content_str, re.IGNORECASE):
-                is_in_target_schedule = True
-            if is_in_target_schedule:
-                match = re.search(PATTERN, row_content_str, re.IGNORECASE)
-                if match:
-                    field_type = data.get("TYPE", "STRING")
-                    if field_type == "NUMERIC" and data.get(
-                        "EXPECTED_ROW_LEN", 0
-                    ) == len(row):
-                        num_keys = len(KEYS)
-                        output = {
-                            key: clean_int(row[-(num_keys - i)])
-                            for i, key in enumerate(KEYS)
-                        }
-                    elif field_type == "NUMERIC" and data.get(
-                        "EXPECTED_ROW_LEN", 0
-                    ) != len(row):
-                        output = {
-                            key: clean_int(match.group(i + 1).strip())
-                            for i, key in enumerate(KEYS)
-                        }
-                    else:
-                        output = {
-                            key: match.group(i + 1).strip()
-                            for i, key in enumerate(KEYS)
-                        }
-                    result[data["id"]] = output
-                    break
+        if config_key in hits:
+            row, match = hits[config_key]
+            result[data["id"]] = _field_output(data, row, match)
     return result
 
 
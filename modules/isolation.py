@@ -0,0 +1,140 @@
+import multiprocessing as mp
+import os
+import signal
+import time
+from collections import deque
+
+try:
+    import psutil
+except ImportError:  # optional: /proc is read instead (Linux only)
+    psutil = None
+
+POLL_SECONDS = 0.1
+# Workers are forked from a small server process, not from the (possibly large)
+# batch process, so their RSS is what the document uses, not inherited memory
+START_METHOD = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+
+
+def _run(conn, fn, args):
+    # Worker side: the result (or the error text) goes back over the pipe. The worker
+    # leads its own process group, so a kill also reaches its page workers
+    if hasattr(os, "setsid"):
+        os.setsid()
+    try:
+        conn.send((True, fn(*args)))
+    except Exception as e:
+        conn.send((False, str(e)))
+    finally:
+        conn.close()
+
+
+def rss_mb(pid):
+    """
+    Resident memory of `pid` in MB (with psutil, plus its child processes such as
+    page workers), or None when it cannot be read on this platform.
+    """
+    if psutil is not None:
+        try:
+            proc = psutil.Process(pid)
+            procs = [proc] + proc.children(recursive=True)
+            return sum(p.memory_info().rss for p in procs) / (1 << 20)
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _kill(proc):
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass  # not yet its own group (killed right after start): proc.kill() below
+    elif psutil is not None:
+        try:
+            for child in psutil.Process(proc.pid).children(recursive=True):
+                child.kill()
+        except psutil.Error:
+            pass
+    proc.kill()
+    proc.join()
+
+
+class IsolatedRunner:
+    """
+    Runs fn(*args) per task in its own process, at most `workers` at a time. A task
+    that runs longer than `timeout` seconds or grows past `max_rss_mb` is killed; the
+    rest of the batch carries on. run() yields (key, ok, result or error message) in
+    completion order.
+    """
+
+    def __init__(self, fn, workers=1, timeout=None, max_rss_mb=None, poll=POLL_SECONDS):
+        self.fn = fn
+        self.workers = max(1, workers or 1)
+        self.timeout = timeout
+        self.max_rss_mb = max_rss_mb
+        self.poll = poll
+        self.ctx = mp.get_context(START_METHOD)
+        if START_METHOD == "forkserver":
+            # Imported once in the server, not once per task (no effect if it already runs)
+            self.ctx.set_forkserver_preload([fn.__module__])
+
+    def _start(self, args):
+        # fn and args are pickled to the worker
+        recv, send = self.ctx.Pipe(duplex=False)
+        proc = self.ctx.Process(target=_run, args=(send, self.fn, args), daemon=False)
+        proc.start()
+        send.close()  # the child holds the only write end: EOF once it exits
+        return proc, recv, time.monotonic()
+
+    def _over_budget(self, proc, started):
+        elapsed = time.monotonic() - started
+        if self.timeout is not None and elapsed > self.timeout:
+            return f"killed: exceeded the time limit of {self.timeout:g}s"
+        if self.max_rss_mb is not None:
+            rss = rss_mb(proc.pid)
+            if rss is not None and rss > self.max_rss_mb:
+                return f"killed: memory {rss:.0f} MB exceeded the limit of {self.max_rss_mb:g} MB"
+        return None
+
+    def run(self, tasks):
+        # tasks: iterable of (key, args)
+        pending = deque(tasks)
+        running = {}
+        try:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    key, args = pending.popleft()
+                    running[key] = self._start(args)
+
+                finished = []
+                for key, (proc, conn, started) in running.items():
+                    if conn.poll():
+                        try:
+                            ok, value = conn.recv()
+                        except EOFError:
+                            proc.join()
+                            ok, value = False, f"worker exited with code {proc.exitcode}"
+                        finished.append((key, ok, value))
+                    elif (reason := self._over_budget(proc, started)) is not None:
+                        _kill(proc)
+                        finished.append((key, False, reason))
+
+                for key, ok, value in finished:
+                    proc, conn, _ = running.pop(key)
+                    conn.close()
+                    proc.join()
+                    yield key, ok, value
+                if not finished:
+                    time.sleep(self.poll)
+        finally:
+            # Generator closed early: do not leave workers behind
+            for proc, conn, _ in running.values():
+                _kill(proc)
+                conn.close()
@@ -0,0 +1,174 @@
+import io
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.config_registry import load_config
+from modules.extract_cache import content_sha256
+from modules.form_sniffer import FormRouter
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of processed ITR1Sections keyed by (PDF content hash, config digest),
+    so the same upload under the same config is never parsed twice in this process.
+    """
+
+    def __init__(self, max_items=5000):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            itr = self._items.get(key)
+            if itr is not None:
+                self._items.move_to_end(key)
+            return itr
+
+    def put(self, key, itr):
+        with self._lock:
+            self._items[key] = itr
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class BatchJob:
+    def __init__(self, job_id, buffers, config_path, cache=None, hashes=None, router=None):
+        self.id = job_id
+        self.buffers = buffers  # {name: bytes}; released once processing is done
+        self.hashes = hashes or {name: content_sha256(data) for name, data in buffers.items()}
+        self.config_path = config_path  # None with a router: each PDF's form picks its config
+        self.router = router
+        self.cache = cache
+        self.status = QUEUED
+        self.stage = "Queued"
+        self.total = len(buffers)
+        self.done = 0
+        self.cached = 0
+        self.current = None
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.errors = {}
+        self.metadata = None
+        self.zip_bytes = None
+        self.count = 0
+        self.report = None  # RunReport: per-stage timings once done
+
+    @property
+    def running(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def throughput(self):
+        # PDFs per second, cache hits included
+        return self.done / self.elapsed if self.elapsed else 0.0
+
+    def run(self, results):
+        self.status = RUNNING
+        self.started = time.perf_counter()
+        try:
+            # Heavy (pandas, pdfplumber, numpy): loaded by the first job, not with the app
+            from modules.ITR1 import DEBUG_OFF, ITR1BatchProcessor
+
+            processor = ITR1BatchProcessor(None, self.config_path, cache=self.cache, debug=DEBUG_OFF,
+                                           router=self.router)
+
+            self.stage = "Processing PDFs"
+            for name, data in self.buffers.items():
+                self.current = name
+                key = (self.hashes[name], processor.config_digest)
+                itr = results.get(key)
+                if itr is not None:
+                    processor.add_result(name, itr, cached=True)
+                    self.cached += 1
+                else:
+                    processor.process_buffers({name: data})
+                    if name in processor.by_file:
+                        results.put(key, processor.by_file[name])
+                self.done += 1
+            self.errors = dict(processor.errors)
+            self.buffers = {}
+            self.current = None
+
+            if processor.results:
+                self.stage = "Building ZIP"
+                self.metadata = processor.metadata().drop(columns=["itr_obj"])
+                buf = io.BytesIO()
+                self.count = processor.export_zip(buf)
+                self.zip_bytes = buf.getvalue() if self.count else None
+            self.report = processor.report
+            self.stage = "Done"
+            self.status = DONE
+        except Exception as e:
+            self.error = str(e)
+            self.stage = "Failed"
+            self.status = FAILED
+        finally:
+            self.finished = time.perf_counter()
+
+
+class JobManager:
+    """
+    Runs batch jobs on background threads so they outlive a Streamlit script run.
+    Submitting the same uploads + config again returns the existing job (instant re-download).
+    """
+
+    def __init__(self, max_concurrent=2, max_cached_results=5000, max_jobs=50, config_dir="config"):
+        self.results = ResultCache(max_cached_results)
+        self.config_dir = config_dir  # configs for auto-routed jobs (config_path=None)
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._by_inputs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="itr-job")
+
+    def submit(self, buffers, config_path, cache=None):
+        # config_path: path or CompiledConfig; a FormRouter, or None for one built from
+        # config_dir, routes each PDF to its form's config (mixed ITR1/ITR2 uploads)
+        router = config_path if isinstance(config_path, FormRouter) else None
+        if config_path is None:
+            router = FormRouter(self.config_dir)
+        config_path = None if router else config_path
+        digest = router.digest if router else load_config(config_path).digest
+        hashes = {name: content_sha256(data) for name, data in buffers.items()}
+        inputs_key = (digest, tuple(hashes.items()))
+        with self._lock:
+            job_id = self._by_inputs.get(inputs_key)
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != FAILED:
+                return job.id
+
+            job = BatchJob(uuid.uuid4().hex, dict(buffers), config_path, cache, hashes, router)
+            self._jobs[job.id] = job
+            self._by_inputs[inputs_key] = job.id
+            self._evict()
+        self._pool.submit(job.run, self.results)
+        return job.id
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def _evict(self):
+        # Oldest finished jobs (and their ZIPs) go first
+        while len(self._jobs) > self.max_jobs:
+            old_id = next((jid for jid, j in self._jobs.items() if not j.running), None)
+            if old_id is None:
+                break
+            del self._jobs[old_id]
+            self._by_inputs = {k: v for k, v in self._by_inputs.items() if v != old_id}
@@ -0,0 +1,197 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from modules.helper import atomic_write
+from modules.isolation import rss_mb
+
+METRIC_PREFIX = "itr"
+
+
+def _sample_value(value):
+    # Exact text for Prometheus: integers in full, floats round-trip (no :g rounding)
+    return f"{value:d}" if isinstance(value, int) else repr(float(value))
+
+
+class StageTimer:
+    """
+    Wall time per named stage for one file (or one batch), plus counters (pages,
+    rows, ...) and the peak RSS seen between stages.
+
+    peak_rss_mb is the whole process's RSS, which also holds whatever the process
+    held before this file (earlier results in a serial batch, other threads' work).
+    rss_growth_mb is the part the file added: the peak over the RSS when the timer
+    was created. Memory freed by earlier files and reused does not show up in it.
+
+    Times are exclusive: rows are pulled lazily, so process_pdf runs inside
+    extract_metadata / extract_sections; the time spent in a nested stage is booked
+    to that stage only, and the stage totals add up to the wall time measured.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counts = {}
+        self.peak_rss_mb = None
+        self.start_rss_mb = rss_mb(os.getpid())
+        self._open = []  # [name, started, time spent in nested stages]
+
+    def start(self, name):
+        self._open.append([name, time.perf_counter(), 0.0])
+
+    def stop(self):
+        name, started, inner = self._open.pop()
+        elapsed = time.perf_counter() - started
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed - inner
+        if self._open:
+            self._open[-1][2] += elapsed
+        else:
+            self.sample_memory()
+
+    @contextmanager
+    def stage(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def timed(self, name, iterator):
+        # Books the time spent producing each item to `name`; closing closes `iterator`
+        try:
+            while True:
+                self.start(name)
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self.stop()
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def count(self, key, n=1):
+        self.counts[key] = self.counts.get(key, 0) + n
+
+    def sample_memory(self):
+        rss = rss_mb(os.getpid())
+        if rss is not None and (self.peak_rss_mb is None or rss > self.peak_rss_mb):
+            self.peak_rss_mb = rss
+
+    @property
+    def rss_growth_mb(self):
+        start = getattr(self, "start_rss_mb", None)  # timers pickled before it was recorded
+        if self.peak_rss_mb is None or start is None:
+            return None
+        return max(0.0, self.peak_rss_mb - start)
+
+    def merge(self, other):
+        for name, seconds in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        for key, n in other.counts.items():
+            self.count(key, n)
+        if other.peak_rss_mb is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, other.peak_rss_mb)
+
+    def __getstate__(self):
+        return {"stages": self.stages, "counts": self.counts, "peak_rss_mb": self.peak_rss_mb,
+                "start_rss_mb": self.start_rss_mb, "_open": []}
+
+
+class RunReport:
+    """
+    Per-file stage timings of a batch (from each result's StageTimer) plus the
+    batch-level stages (export_by_pan, export_zip, ...) in `batch`. Written as a
+    JSON run report and as a Prometheus text-format metrics file.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.files = {}
+        self.batch = StageTimer()
+
+    def add(self, name, itr=None, error=None, cached=False):
+        timer = getattr(itr, "timer", None)
+        status = "failed" if error is not None else "cached" if cached else "done"
+        rec = {"file": name, "status": status, "seconds": getattr(itr, "elapsed", None), "error": error}
+        if timer is not None and not cached:
+            rec.update(stages=dict(timer.stages), peak_rss_mb=timer.peak_rss_mb,
+                       rss_growth_mb=timer.rss_growth_mb, **timer.counts)
+        self.files[name] = rec
+
+    def stage_totals(self):
+        totals = {}
+        for rec in self.files.values():
+            for name, seconds in rec.get("stages", {}).items():
+                totals[name] = totals.get(name, 0.0) + seconds
+        for name, seconds in self.batch.stages.items():
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def summary(self):
+        # One row per stage, slowest first (e.g. for st.dataframe)
+        totals = self.stage_totals()
+        overall = sum(totals.values()) or 1.0
+        files = [rec for rec in self.files.values() if rec.get("stages")]
+        rows = []
+        for name, seconds in sorted(totals.items(), key=lambda kv: -kv[1]):
+            n = sum(1 for rec in files if name in rec["stages"])
+            rows.append({
+                "stage": name,
+                "seconds": round(seconds, 3),
+                "share_%": round(100 * seconds / overall, 1),
+                "files": n,
+                "avg_seconds": round(seconds / n, 3) if n else None,
+            })
+        return rows
+
+    def to_dict(self):
+        return {
+            "started": self.started,
+            "finished": time.time(),
+            "files": list(self.files.values()),
+            "batch_stages": dict(self.batch.stages),
+            "stage_totals": self.stage_totals(),
+        }
+
+    def write_json(self, path):
+        atomic_write(path, json.dumps(self.to_dict(), indent=2, default=str).encode("utf-8"))
+
+    def metrics_text(self):
+        p = METRIC_PREFIX
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+            for labels, value in samples:
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                value = _sample_value(value)
+                lines.append(f"{p}_{name}{{{label_str}}} {value}" if label_str else f"{p}_{name} {value}")
+
+        by_status = {}
+        for rec in self.files.values():
+            by_status[rec["status"]] = by_status.get(rec["status"], 0) + 1
+        metric("files_total", "counter", "PDFs by outcome",
+               [({"status": s}, n) for s, n in sorted(by_status.items())])
+        metric("stage_seconds_total", "counter", "Wall time per pipeline stage",
+               [({"stage": s}, v) for s, v in sorted(self.stage_totals().items())])
+        for key in ("pages", "rows"):
+            total = sum(rec.get(key) or 0 for rec in self.files.values())
+            metric(f"{key}_total", "counter", f"Extracted {key}", [({}, total)])
+        growth = [rec["rss_growth_mb"] for rec in self.files.values() if rec.get("rss_growth_mb") is not None]
+        if growth:
+            metric("file_rss_growth_megabytes", "gauge",
+                   "Largest RSS growth over the RSS at the start of one PDF", [({}, max(growth))])
+        peaks = [rec["peak_rss_mb"] for rec in self.files.values() if rec.get("peak_rss_mb") is not None]
+        if peaks:
+            metric("process_peak_rss_megabytes", "gauge",
+                   "Highest process RSS seen while processing a PDF (includes memory held before it)",
+                   [({}, max(peaks))])
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path):
+        atomic_write(path, self.metrics_text().encode("utf-8"))
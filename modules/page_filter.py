@@ -0,0 +1,68 @@
+import hashlib
+import re
+
+from modules.config_registry import required_literals
+from modules.row_store import row_text
+from modules.section_state import SectionState
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _literal_tokens(pattern):
+    # One token list per alternative: the whitespace-free pieces of its required
+    # literal. None means the pattern cannot be prefiltered (page always wanted)
+    literals = required_literals(pattern)
+    if not literals:
+        return None
+    alternatives = [literal.split() for literal in literals]
+    return None if [] in alternatives else alternatives
+
+
+def _may_match(alternatives, text):
+    return alternatives is None or any(all(t in text for t in tokens) for tokens in alternatives)
+
+
+class PageFilter:
+    """
+    Decides, page by page, whether page.extract_table() has to run.
+
+    Section state (current section, its header row) is tracked on the extracted
+    table rows by the same SectionState that ITR1Sections.extract_sections runs. A
+    page is only skipped when no section is open and its text layer cannot contain
+    a start pattern (or one of the `keep` patterns, e.g. metadata): every whitespace-free
+    token of the pattern's required literal (of one of them, for an alternation)
+    must appear in the page text for it to match. Tokens are checked one by one,
+    not as a phrase, because a wrapped cell can interleave with its neighbours in
+    the page text. Skipped pages therefore never change section state, so the
+    section frames built from the extracted rows are the same as without the filter.
+
+    Row numbers are not: rows of skipped pages are never extracted (so not even
+    counted), and row indices, section_ranges and extract_sections_log entries count
+    extracted rows only. They match the filtered run's own _extracted.txt dump
+    (skipped pages are marked there), not an unfiltered run.
+    """
+
+    def __init__(self, compiled, keep=()):
+        self.state = SectionState(compiled.start_scanner, compiled.end_patterns, compiled.hdr_row_map)
+        self._tokens = [_literal_tokens(pat) for pat in compiled.start_scanner.patterns.values()]
+        self._keep_tokens = [_literal_tokens(pat) for pat in keep]
+        self.digest = hashlib.sha256(
+            "\n".join([compiled.digest] + [f"{p.pattern}/{p.flags}" for p in keep]).encode()
+        ).hexdigest()
+        self.row_index = 0
+        self.skipped = []  # page numbers never table-extracted
+
+    def wants(self, page_text):
+        if self.state.current_section is not None:
+            return True
+        text = _WHITESPACE.sub("", page_text or "").lower()
+        return any(_may_match(alternatives, text) for alternatives in self._tokens + self._keep_tokens)
+
+    def release_keep(self):
+        # Once the caller has what the keep patterns were for (e.g. metadata found)
+        self._keep_tokens = []
+
+    def feed(self, row):
+        # Every extracted row, in order, so section state follows extract_sections
+        self.state.feed(self.row_index, row, row_text(row))
+        self.row_index += 1
@@ -1,29 +1,208 @@
 
+import io
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
 import pdfplumber
 
-def process_pdf(input_file_path, output_file_path):
-    result = []
+# Pages per worker task when one document is extracted across processes
+PAGE_SHARD_SIZE = 8
+
+class _NoDump:
+    def write(self, _):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+def _open_dump(output_file_path):
+    # The _extracted.txt dump is optional (None = no file written)
+    if output_file_path is None:
+        return _NoDump()
+    return open(output_file_path, 'w', encoding='utf-8')
+
+def _source_name(input_file_path, source):
+    return str(input_file_path if isinstance(input_file_path, str) else getattr(source, 'name', '<memory>'))
+
+def _page_rows(outfile, page_num, table, index):
+    # Dumps one page's table and returns its non-empty rows + the next row index
+    rows = []
+    if table:
+        column_len = len(table)
+        for i, row in zip(range(column_len), table):
+            row_len = len(row)
+            if i == 0:
+                prt_str = f"#--------- Page:{page_num} Rows:{row_len} Columns:{column_len} --------#"
+                outfile.write(prt_str + '\n')
+            # cleaned_row = [element for element in row if element is not None and element != '']
+            cleaned_row = [element for element in row]
+            outfile.write(str(index) + '|'+str(len(cleaned_row))+ '|')
+            index=index+1
+            if cleaned_row:
+                line = str(cleaned_row)
+                outfile.write(line + '\n')
+                rows.append(cleaned_row)
+    else:
+        prt_str = f"#--------- Page:{page_num} No table found on this page. --------#"
+        outfile.write(prt_str + '\n')
+    return rows, index
+
+def _dump_cached_rows(output_file_path, source_name, rows):
+    # _extracted.txt for a cache hit: same row lines, but page breaks are not cached
+    with _open_dump(output_file_path) as outfile:
+        outfile.write(source_name + '\n')
+        outfile.write(f"#--------- Rows:{len(rows)} from the extraction cache (page breaks not recorded) --------#" + '\n')
+        for index, row in enumerate(rows):
+            outfile.write(str(index) + '|' + str(len(row)) + '|' + str(row) + '\n')
+
+def _count(stats, key, n=1):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + n
+
+def iter_pdf_rows(input_file_path, output_file_path=None, page_filter=None, stats=None, release_pages=True,
+                  on_page=None):
+    # Page-by-page generator; closing it early stops opening further pages.
+    # input_file_path may also be raw bytes or a binary file-like object (uploads).
+    # page_filter (PageFilter): skip extract_table on pages that cannot hold a section.
+    # stats (dict): "pages" / "pages_skipped" counters are added to it.
+    # release_pages: drop each page's parsed chars / layout once its table is out, so
+    # memory follows the largest page rather than the page count (pdfplumber otherwise
+    # keeps every visited page's objects until the document is closed).
+    # on_page(): called after every page (e.g. to sample memory).
+    source = io.BytesIO(input_file_path) if isinstance(input_file_path, (bytes, bytearray)) else input_file_path
     index = 0
-    with pdfplumber.open(input_file_path) as pdf, open(output_file_path, 'w', encoding='utf-8') as outfile:
-        outfile.write(input_file_path + '\n')
+    with pdfplumber.open(source) as pdf, _open_dump(output_file_path) as outfile:
+        outfile.write(_source_name(input_file_path, source) + '\n')
         for page_num, page in enumerate(pdf.pages, start=1):
-            table = page.extract_table()
-            if table:
-                column_len = len(table)
-                for i, row in zip(range(column_len), table):
-                    row_len = len(row)
-                    if i == 0:
-                        prt_str = f"#--------- Page:{page_num} Rows:{row_len} Columns:{column_len} --------#"
-                        outfile.write(prt_str + '\n')
-                    # cleaned_row = [element for element in row if element is not None and element != '']
-                    cleaned_row = [element for element in row]
-                    outfile.write(str(index) + '|'+str(len(cleaned_row))+ '|')
-                    index=index+1
-                    if cleaned_row:
-                        result.append(cleaned_row)
-                        line = str(cleaned_row)
-                        outfile.write(line + '\n')
+            _count(stats, "pages")
+            if page_filter is not None and not page_filter.wants(page.extract_text()):
+                page_filter.skipped.append(page_num)
+                _count(stats, "pages_skipped")
+                outfile.write(f"#--------- Page:{page_num} Skipped by page filter. --------#" + '\n')
+                rows = []
             else:
-                prt_str = f"#--------- Page:{page_num} No table found on this page. --------#"
-                outfile.write(prt_str + '\n')
-    return result
+                rows, index = _page_rows(outfile, page_num, page.extract_table(), index)
+            if release_pages:
+                page.close()
+            if on_page is not None:
+                on_page()
+            for row in rows:
+                if page_filter is not None:
+                    page_filter.feed(row)
+                yield row
+
+def _extract_page_range(source, first, last, release_pages=True):
+    # Runs in a worker: tables of pages first..last-1 (0-based), one entry per page
+    source = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    tables = []
+    with pdfplumber.open(source) as pdf:
+        for page in pdf.pages[first:last]:
+            tables.append(page.extract_table())
+            if release_pages:
+                page.close()
+    return tables
+
+def iter_sharded_pdf_rows(input_file_path, output_file_path=None, workers=2, shard_pages=PAGE_SHARD_SIZE,
+                          stats=None, on_page=None):
+    """
+    Same rows (and dump) as iter_pdf_rows, but disjoint page ranges are extracted
+    by `workers` processes that each open the PDF themselves. Shards are merged
+    back in page order, so row indices are the ones the serial path gives. At most
+    2 * workers shards are in flight; closing the generator cancels the rest.
+    """
+    name = _source_name(input_file_path, input_file_path)
+    if hasattr(input_file_path, 'read'):
+        input_file_path.seek(0)
+        input_file_path = input_file_path.read()  # workers need something picklable
+    source = io.BytesIO(input_file_path) if isinstance(input_file_path, (bytes, bytearray)) else input_file_path
+    with pdfplumber.open(source) as pdf:
+        n_pages = len(pdf.pages)
+    if workers < 2 or n_pages <= shard_pages:
+        yield from iter_pdf_rows(input_file_path, output_file_path, stats=stats, on_page=on_page)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=min(workers, -(-n_pages // shard_pages)))
+    in_flight = deque()
+    index = 0
+    try:
+        with _open_dump(output_file_path) as outfile:
+            outfile.write(name + '\n')
+            for first in range(0, n_pages, shard_pages):
+                last = min(first + shard_pages, n_pages)
+                in_flight.append((first, pool.submit(_extract_page_range, input_file_path, first, last)))
+                while len(in_flight) >= 2 * workers or (in_flight and last == n_pages):
+                    first, fut = in_flight.popleft()
+                    for page_num, table in enumerate(fut.result(), start=first + 1):
+                        _count(stats, "pages")
+                        rows, index = _page_rows(outfile, page_num, table, index)
+                        if on_page is not None:
+                            on_page()
+                        yield from rows
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def process_pdf(input_file_path, output_file_path=None, page_filter=None):
+    return list(iter_pdf_rows(input_file_path, output_file_path, page_filter))
+
+
+# Anything that changes the rows returned by process_pdf must be reflected here
+EXTRACT_SETTINGS = {
+    "extractor": "page.extract_table",
+    "table_settings": None,
+    "pdfplumber": pdfplumber.__version__,
+}
+
+
+def _iter_rows(input_file_path, output_file_path, page_filter, page_workers, stats, on_page=None):
+    if page_workers and page_workers > 1 and page_filter is None:
+        return iter_sharded_pdf_rows(input_file_path, output_file_path, page_workers, stats=stats, on_page=on_page)
+    return iter_pdf_rows(input_file_path, output_file_path, page_filter, stats, on_page=on_page)
+
+
+def iter_cached_pdf_rows(input_file_path, output_file_path=None, cache=None, page_filter=None, page_workers=None,
+                         stats=None, on_page=None, stop_key=None):
+    # page_workers: shard the document's pages across processes (ignored with a page_filter,
+    # whose decisions depend on the pages before)
+    # stop_key: names a reader that always stops at the same row of a given document
+    # (e.g. its section config); when it closes the generator early, the rows it got
+    # are cached for that reader only and the remaining pages are never opened
+    if cache is None:
+        yield from _iter_rows(input_file_path, output_file_path, page_filter, page_workers, stats, on_page)
+        return
+
+    settings = EXTRACT_SETTINGS
+    if page_filter is not None:
+        # Filtered documents hold fewer rows: never mix them with full extractions
+        settings = dict(EXTRACT_SETTINGS, page_filter=page_filter.digest)
+    key = cache.key(input_file_path, settings)
+    stopped_key = cache.key(input_file_path, dict(settings, stopped_by=stop_key)) if stop_key else None
+    for hit_key in filter(None, (key, stopped_key)):
+        rows = cache.get(hit_key)
+        if rows is None:
+            continue
+        _count(stats, "extract_cache_hit")
+        if output_file_path is not None:
+            _dump_cached_rows(output_file_path, _source_name(input_file_path, input_file_path), rows)
+        yield from rows
+        if hit_key == stopped_key:
+            # Read past where this reader stopped before: extract again, after the rows given
+            source = _iter_rows(input_file_path, output_file_path, page_filter, page_workers, stats, on_page)
+            yield from islice(source, len(rows), None)
+        return
+
+    rows = []
+    source = _iter_rows(input_file_path, output_file_path, page_filter, page_workers, stats, on_page)
+    try:
+        for row in source:
+            rows.append(row)
+            yield row
+    except GeneratorExit:
+        source.close()
+        if stopped_key is not None:
+            cache.put(stopped_key, rows)
+        return
+    cache.put(key, rows)
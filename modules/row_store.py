@@ -0,0 +1,127 @@
+from array import array
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def row_text(row):
+    # The text every row-level regex runs on (None / "" cells dropped)
+    return " ".join(str(x) for x in row if x)
+
+
+class RowView(Sequence):
+    """
+    Rows start..end of a RowStore, without copying them. Rows are materialised as
+    lists only when indexed or iterated.
+    """
+
+    def __init__(self, store, start, end):
+        self.store = store
+        self.start, self.end = start, end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, end, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, end, step)]
+            return RowView(self.store, self.start + start, self.start + end)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.store[self.start + i]
+
+    def frame(self):
+        return self.store.frame(self.start, self.end)
+
+
+class RowStore(Sequence):
+    """
+    Extracted table rows in a compact, append-only form.
+
+    Every distinct cell string is stored once (interned); a row is a run of int32
+    codes in one array (0 = None), located through a row-offset array. The joined
+    text of each row is computed once on append and kept in `texts`, so metadata
+    and section scans do not re-join cells. Slicing gives a RowView; frame() builds
+    a section DataFrame with one numpy take instead of per-row lists.
+    """
+
+    def __init__(self, rows=()):
+        self._strings = [None]
+        self._codes = {}
+        self._cells = array("i")
+        self._offsets = array("q", [0])
+        self._string_array = None  # _strings as a numpy object array, for frame()
+        self.texts = []
+        for row in rows:
+            self.append(row)
+
+    def _code(self, value):
+        if value is None:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    def append(self, row):
+        self._cells.extend(self._code(v) for v in row)
+        self._offsets.append(len(self._cells))
+        self.texts.append(row_text(row))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, end, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, end, step)]
+            return RowView(self, start, end)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        strings = self._strings
+        return [strings[c] for c in self._cells[self._offsets[i]:self._offsets[i + 1]]]
+
+    def frame(self, start, end):
+        # Same frame as pd.DataFrame(rows[start:end]): short rows padded with None
+        end = min(end, len(self))
+        if end <= start:
+            return pd.DataFrame()
+        offsets = np.frombuffer(self._offsets, dtype=np.int64)[start:end + 1]
+        lengths = np.diff(offsets)
+        cells = np.frombuffer(self._cells, dtype=np.int32)[offsets[0]:offsets[-1]]
+        width = int(lengths.max())
+        if (lengths == width).all():
+            codes = cells.reshape(len(lengths), width)
+        else:
+            codes = np.zeros((len(lengths), width), dtype=np.int32)
+            cols = np.arange(len(cells)) - np.repeat(offsets[:-1] - offsets[0], lengths)
+            codes[np.repeat(np.arange(len(lengths)), lengths), cols] = cells
+        return pd.DataFrame(self._strings_array()[codes])
+
+    def _strings_array(self):
+        # Built once and reused by every frame() until new strings are interned
+        # (_strings only grows, so its length tells whether the copy is current)
+        if self._string_array is None or len(self._string_array) != len(self._strings):
+            self._string_array = np.empty(len(self._strings), dtype=object)
+            self._string_array[:] = self._strings
+        return self._string_array
+
+    def __getstate__(self):
+        # The intern map is rebuilt on load
+        state = dict(self.__dict__)
+        del state["_codes"]
+        state["_string_array"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._codes = {s: i for i, s in enumerate(self._strings) if s is not None}
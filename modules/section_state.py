@@ -0,0 +1,59 @@
+import re
+
+from modules.config_registry import EMPTY_ROW_SPECIFIC
+from modules.helper import is_empty_row_specific
+
+
+class SectionState:
+    """
+    Section state over table rows, fed one row at a time: a start pattern opens a
+    section, its header row sets the start index, its end pattern (or empty row)
+    closes it. ITR1Sections.extract_sections and the PageFilter both run on this,
+    so the filter can never disagree with the scan it skips pages for.
+
+    log: optional log(idx, section, event, text=None) called on every transition.
+    """
+
+    def __init__(self, scanner, end_patterns, hdr_row_map, log=None):
+        self.scanner = scanner
+        self.end_patterns = end_patterns  # compiled, see config_registry.compile_patterns
+        self.hdr_row_map = hdr_row_map
+        self.log = log or (lambda *args: None)
+        self.current_section = None
+        self.start_index = None
+
+    def feed(self, idx, row, row_str):
+        # row_str: row_text(row). Returns (section, start, end) when row idx closes a section
+        sec = self.scanner.first_match(row_str)
+        if sec:
+            self.log(idx, sec, "start_match", row_str)
+            self.current_section = sec
+            self.start_index = None
+
+        if self.current_section and not self.start_index:
+            hdrs = self.hdr_row_map.get(self.current_section, [])
+            if row and row[0] != "" and any(h in row for h in hdrs):
+                self.start_index = idx
+                self.log(idx, self.current_section, "header_match", row_str)
+                return None
+
+        if self.current_section and self.start_index:
+            end_pat = self.end_patterns.get(self.current_section)
+            is_end = False
+
+            if isinstance(end_pat, re.Pattern) and end_pat.search(row_str):
+                is_end = True
+                self.log(idx, self.current_section, "end_match", row_str)
+
+            if end_pat == EMPTY_ROW_SPECIFIC and is_empty_row_specific(row):
+                is_end = True
+                self.log(idx, self.current_section, "empty_row_match", row_str)
+
+            if is_end:
+                closed = (self.current_section, self.start_index, idx + 1)
+                self.log(idx, self.current_section, "section_completed")
+                self.current_section = None
+                self.start_index = None
+                return closed
+
+        return None
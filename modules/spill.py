@@ -0,0 +1,94 @@
+import os
+import pickle
+import re
+import tempfile
+from collections.abc import Mapping
+
+import pandas as pd
+
+
+def _safe_name(value):
+    return re.sub(r"[^\w.-]", "_", str(value))
+
+
+class SpilledFrames(Mapping):
+    """
+    Read-only {section: DataFrame} backed by a spill file. Section names are kept in
+    memory; the frames are read from disk on access and not held on to.
+    """
+
+    def __init__(self, path, sections):
+        self.path = path
+        self.sections = list(sections)
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            return pickle.load(f)
+
+    def __getitem__(self, section):
+        if section not in self.sections:
+            raise KeyError(section)
+        return self._load()[section]
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def items(self):
+        # One read for all sections (Mapping.items would read once per key)
+        frames = self._load()
+        return [(section, frames[section]) for section in self.sections]
+
+    def values(self):
+        return [frame for _, frame in self.items()]
+
+
+class SpilledSections:
+    """
+    What the batch export needs from an ITR1Sections (ack / dof / pan / dataframes),
+    with the frames on disk. Small enough to keep one per return for any batch size.
+    """
+
+    def __init__(self, itr, path):
+        self.ack, self.dof, self.pan = itr.ack, itr.dof, itr.pan
+        self.sections = itr.sections  # section ranges, as on ITR1Sections
+        self.elapsed = getattr(itr, "elapsed", None)
+        self.timer = getattr(itr, "timer", None)  # stage timings for the run report
+        self.form, self.ay = getattr(itr, "form", None), getattr(itr, "ay", None)
+        self.dataframes = SpilledFrames(path, itr.dataframes.keys())
+
+    def get_section(self, name):
+        return self.dataframes[name] if name in self.dataframes else pd.DataFrame()
+
+
+class SpillStore:
+    """
+    Section frames of processed returns on disk, one pickle per return, grouped in a
+    folder per PAN: <spill_dir>/<pan>/<ack>_<file>.pkl. Pickle keeps the frames exactly
+    as built (mixed object columns, integer column labels), which the workbooks need.
+    """
+
+    def __init__(self, spill_dir):
+        self.spill_dir = os.path.abspath(spill_dir)
+
+    def path(self, itr, name):
+        pan_dir = _safe_name(itr.pan) if itr.pan else "_no_pan"
+        return os.path.join(self.spill_dir, pan_dir, _safe_name(f"{itr.ack}_{name}") + ".pkl")
+
+    def put(self, itr, name):
+        if isinstance(itr, SpilledSections):
+            return itr
+        path = self.path(itr, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(dict(itr.dataframes), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return SpilledSections(itr, path)
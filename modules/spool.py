@@ -0,0 +1,288 @@
+import glob
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import fcntl
+except ImportError:  # optional: without it only one daemon may share a spool
+    fcntl = None
+
+from modules.ITR1 import DEBUG_OFF, ITR1BatchProcessor, _sections
+from modules.checkpoint import ResultStore
+from modules.helper import atomic_write
+from modules.config_registry import load_config
+from modules.extract_cache import file_sha256
+from modules.spill import SpillStore, _safe_name
+from modules.xlsx_export import write_sections
+
+POLL_SECONDS = 1.0
+SETTLE_SECONDS = 2.0  # an inbox PDF modified more recently may still be being copied in
+
+# Warm state of a pool worker, set once by _warm()
+_WORKER = {}
+
+
+class _FileLock:
+    # Exclusive flock on `path` (no-op without fcntl)
+    def __init__(self, path, blocking=True):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.f = open(path, "a")
+        if fcntl is not None:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(self.f, flags)
+            except OSError:
+                self.f.close()
+                raise
+
+    def release(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _warm(config_path, router, state_dir, outbox, cache, options):
+    # Pool initializer: compile configs once per worker, Ctrl-C is the parent's to handle
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if config_path:
+        load_config(config_path)
+    _WORKER.update(config_path=config_path, router=router, state_dir=state_dir, outbox=outbox,
+                   cache=cache, options=options,
+                   digest=router.digest if router else load_config(config_path).digest)
+
+
+def _process_claimed(path, name):
+    """
+    Worker side of the spool: sections of one claimed PDF, spilled to the state dir,
+    then the workbook of its PAN rebuilt (under the PAN's lock) into the outbox.
+    """
+    w = _WORKER
+    itr = _sections(path, None, w["config_path"], w["cache"], DEBUG_OFF, w["options"], w["router"]).slim()
+    stub = SpillStore(os.path.join(w["state_dir"], "spill")).put(itr, name)
+    result = {"ack": stub.ack, "pan": stub.pan, "form": stub.form, "seconds": itr.elapsed}
+    if stub.pan is None:
+        return result
+
+    pan_key = _safe_name(stub.pan)
+    with _FileLock(os.path.join(w["state_dir"], "locks", pan_key + ".lock")):
+        # Every return of the PAN under this config; re-dropped PDFs overwrite their entry
+        store = ResultStore(os.path.join(w["state_dir"], "pans", pan_key))
+        store.save(file_sha256(path), w["digest"], stub)
+        saved = sorted(glob.glob(os.path.join(store.store_dir, f"*_{w['digest'][:16]}.pkl")), key=os.path.getmtime)
+        processor = ITR1BatchProcessor(None, w["config_path"], debug=DEBUG_OFF, router=w["router"])
+        for pkl in saved:
+            sha = os.path.basename(pkl).split("_", 1)[0]
+            processor.add_result(pkl, store.load(sha, w["digest"]))  # newest return per ack wins
+        for pan, sheets in processor.iter_by_pan([stub.pan]):
+            output_file = os.path.join(w["outbox"], f"{pan}.xlsx")
+            tmp = os.path.join(w["outbox"], f".{pan}.xlsx.tmp")
+            write_sections(tmp, sheets)
+            os.replace(tmp, output_file)  # readers of the outbox never see a partial workbook
+            result["workbook"] = output_file
+    return result
+
+
+class SpoolDaemon:
+    """
+    Long-running batch service over a spool directory:
+
+        <spool>/inbox/            drop PDFs here (copy in, or better: write elsewhere, then move)
+        <spool>/work/<node>/      claimed by daemon <node>, being processed
+        <spool>/done/, failed/    processed PDFs (failed ones with <name>.error.txt)
+        <spool>/outbox/           <PAN>.xlsx, rebuilt whenever a return of that PAN arrives
+        <spool>/state/            spilled frames and the per-PAN result index
+
+    A PDF is claimed by renaming it from inbox/ into this node's work dir, which is
+    atomic on one filesystem: when several daemons (or nodes on a shared filesystem)
+    race for a file, exactly one rename succeeds. Claimed files go to a pool of warm
+    worker processes (configs compiled, pdfplumber imported) that lives as long as
+    the daemon, so a return costs its own processing time only.
+    """
+
+    def __init__(self, spool_dir, config_path=None, router=None, workers=2, node=None, cache=None,
+                 prefilter=False, poll=POLL_SECONDS, settle=SETTLE_SECONDS, reclaim_after=None, log=print):
+        self.spool_dir = spool_dir
+        self.config_path = config_path
+        self.router = router
+        # Fail on a bad config before any file is claimed
+        self.digest = router.digest if router else load_config(config_path).digest
+        self.workers = workers
+        # Stable per host by default, so a restarted daemon picks its own claims back up
+        self.node = _safe_name(node or socket.gethostname())
+        self.cache = cache
+        self.prefilter = prefilter
+        self.poll = poll
+        self.settle = settle
+        # reclaim_after: seconds after which files claimed by another (dead) node are taken over
+        self.reclaim_after = reclaim_after
+        self.log = log
+        self.dirs = {d: os.path.join(spool_dir, d) for d in ("inbox", "work", "done", "failed", "outbox", "state")}
+        self.work_dir = os.path.join(self.dirs["work"], self.node)
+        for path in list(self.dirs.values()) + [self.work_dir]:
+            os.makedirs(path, exist_ok=True)
+        self.processed = self.failed = 0
+        self._stopping = False
+        self._crashes = {}  # claimed path → pool crashes while it was in flight
+
+    # ---------------------------------------------------------
+    # ✅ Claiming
+    # ---------------------------------------------------------
+    def _claim(self, src, name):
+        # Claimed as <claim time>-<name>, so a later PDF of the same name never clobbers it
+        dst = os.path.join(self.work_dir, f"{time.time_ns()}-{name}")
+        try:
+            os.rename(src, dst)
+        except FileNotFoundError:
+            return None  # another daemon won the race
+        os.utime(dst)  # mtime = claim time (see reclaim_after)
+        return dst
+
+    def claim(self, limit):
+        # Up to `limit` settled inbox PDFs, oldest first
+        now = time.time()
+        candidates = []
+        with os.scandir(self.dirs["inbox"]) as it:
+            for entry in it:
+                if not entry.is_file() or not entry.name.lower().endswith(".pdf"):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if now - mtime >= self.settle:
+                    candidates.append((mtime, entry.name))
+        claimed = []
+        for _, name in sorted(candidates):
+            if len(claimed) >= limit:
+                break
+            path = self._claim(os.path.join(self.dirs["inbox"], name), name)
+            if path:
+                claimed.append(path)
+        return claimed
+
+    def reclaim(self):
+        # Files this node claimed before a crash, plus (with reclaim_after) stale claims of other nodes
+        paths = sorted(self._pdfs(self.work_dir))
+        if self.reclaim_after is None:
+            return paths
+        for other in os.listdir(self.dirs["work"]):
+            if other == self.node:
+                continue
+            for src in self._pdfs(os.path.join(self.dirs["work"], other)):
+                try:
+                    stale = time.time() - os.path.getmtime(src) > self.reclaim_after
+                except FileNotFoundError:
+                    continue
+                if stale:
+                    path = self._claim(src, self.original_name(src))
+                    if path:
+                        paths.append(path)
+        return paths
+
+    @staticmethod
+    def _pdfs(folder):
+        if not os.path.isdir(folder):
+            return []
+        return [os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".pdf")]
+
+    @staticmethod
+    def original_name(path):
+        return os.path.basename(path).split("-", 1)[1]
+
+    # ---------------------------------------------------------
+    # ✅ Service loop
+    # ---------------------------------------------------------
+    def _pool(self):
+        options = {"prefilter": self.prefilter}
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_warm,
+            initargs=(self.config_path, self.router, self.dirs["state"], self.dirs["outbox"], self.cache, options),
+        )
+
+    def _finish(self, path, ok, value):
+        self._crashes.pop(path, None)
+        name = self.original_name(path)
+        latency = time.time() - os.path.getmtime(path)
+        if ok:
+            os.replace(path, os.path.join(self.dirs["done"], os.path.basename(path)))
+            self.processed += 1
+            target = os.path.basename(value["workbook"]) if value.get("workbook") else "no PAN, no workbook"
+            self.log(f"✅ {name} → {target} ({value['seconds']:.2f}s, {latency:.2f}s since claim)")
+        else:
+            failed = os.path.join(self.dirs["failed"], os.path.basename(path))
+            os.replace(path, failed)
+            atomic_write(failed + ".error.txt", str(value).encode("utf-8"))
+            self.failed += 1
+            self.log(f"❌ {name}: {value}")
+
+    def stop(self, *_):
+        # Stop claiming; files already claimed are finished first
+        self._stopping = True
+
+    def run(self, once=False):
+        """
+        Serve until stop() (SIGTERM / SIGINT when installed by the caller); with
+        once=True, exit when the inbox and the pool are empty.
+        """
+        try:
+            node_lock = _FileLock(os.path.join(self.work_dir, ".lock"), blocking=False)
+        except OSError:
+            raise RuntimeError(f"another daemon is running as node {self.node!r} (pass a different node)")
+        pool = self._pool()
+        in_flight = {}  # future → claimed path
+        backlog = self.reclaim()
+        if backlog:
+            self.log(f"resuming {len(backlog)} claimed file(s)")
+        try:
+            while True:
+                room = 2 * self.workers - len(in_flight) - len(backlog)
+                if not self._stopping and room > 0:
+                    backlog += self.claim(room)
+                for path in backlog:
+                    in_flight[pool.submit(_process_claimed, path, self.original_name(path))] = path
+                backlog = []
+                if not in_flight:
+                    if once or self._stopping:
+                        break
+                    time.sleep(self.poll)
+                    continue
+
+                done, _ = wait(in_flight, timeout=self.poll, return_when=FIRST_COMPLETED)
+                broken = []
+                for fut in done:
+                    path = in_flight.pop(fut)
+                    try:
+                        value = fut.result()
+                    except BrokenProcessPool:
+                        broken.append(path)
+                        continue
+                    except Exception as e:
+                        self._finish(path, False, e)
+                        continue
+                    self._finish(path, True, value)
+                if broken:
+                    # A dead worker takes the pool and all its files with it; which file
+                    # killed it is unknown, so each is retried once on a fresh pool
+                    broken += in_flight.values()
+                    in_flight.clear()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self._pool()
+                    for path in broken:
+                        self._crashes[path] = self._crashes.get(path, 0) + 1
+                        if self._crashes[path] > 1:
+                            self._finish(path, False, "worker process died while processing this file")
+                        else:
+                            backlog.append(path)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            node_lock.release()
+        return self.processed, self.failed
@@ -0,0 +1,73 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+MAX_COL_WIDTH = 60
+# Header row style of the workbooks, fixed here on purpose: it is the look exports
+# had when they went through DataFrame.to_excel, which pandas 3 no longer styles,
+# so it must not follow whatever pandas is installed
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+
+def _is_missing(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value))
+
+
+def pan_col_width(longest):
+    return min(longest + 2, MAX_COL_WIDTH)
+
+
+def section_col_width(longest):
+    return max(longest + 2, MAX_COL_WIDTH)
+
+
+def write_sections(output_file, sheets, separator=True, col_width=pan_col_width):
+    """
+    Stream section frames into an .xlsx without to_excel / concat.
+
+    sheets: iterable of (sheet_name, [frame, ...]); frames are the final section
+    frames (metadata header row, column header row, data rows). Layout matches the
+    previous pandas output: a bold 0..n-1 column index row, then each frame, each followed
+    by a blank separator row when `separator` is set. Column widths are tracked while
+    cells are written. Rows are flushed as they go (constant_memory), so peak memory
+    does not grow with sheet size. A file-like `output_file` (BytesIO, a ZIP entry)
+    is built in memory instead, so nothing touches disk.
+    """
+    if isinstance(output_file, (str, os.PathLike)):
+        options = {"constant_memory": True}
+    else:
+        options = {"in_memory": True}
+    workbook = xlsxwriter.Workbook(output_file, options)
+    header_format = workbook.add_format(HEADER_FORMAT)
+    try:
+        for sheet_name, frames in sheets:
+            worksheet = workbook.add_worksheet(sheet_name)
+            ncols = max(len(frame.columns) for frame in frames)
+            widths = [len(str(col)) for col in range(ncols)]
+            for col in range(ncols):
+                worksheet.write(0, col, col, header_format)
+
+            row_idx = 1
+            for frame in frames:
+                for values in frame.itertuples(index=False, name=None):
+                    for col, value in enumerate(values):
+                        if _is_missing(value):
+                            continue
+                        if isinstance(value, np.generic):
+                            value = value.item()
+                        worksheet.write(row_idx, col, value)
+                        length = len(str(value))
+                        if length > widths[col]:
+                            widths[col] = length
+                    row_idx += 1
+                if separator:
+                    row_idx += 1
+
+            for col, longest in enumerate(widths):
+                worksheet.set_column(col, col, col_width(longest))
+    finally:
+        workbook.close()
+    return output_file
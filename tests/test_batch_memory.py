@@ -0,0 +1,30 @@
+import gc
+
+from benchmarks.fixtures import CONFIG, return_rows, write_pdf
+from modules.ITR1 import DEBUG_OFF, ITR1BatchProcessor, ITR1Sections
+
+
+def _live_results():
+    return sum(isinstance(o, ITR1Sections) for o in gc.get_objects())
+
+
+def test_parallel_batch_keeps_a_bounded_window_of_results(tmp_path):
+    # A slow first file while the short ones finish: without a window every finished
+    # result would sit in its future until the first one is collected
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    files = []
+    for i in range(12):
+        name = f"{i:02d}.pdf"
+        write_pdf(str(pdf_dir / name), return_rows(30 if i == 0 else 2, seed=i, ack=f"1000000000{i:02d}"))
+        files.append(name)
+
+    workers = 2
+    processor = ITR1BatchProcessor(str(pdf_dir), CONFIG, debug=DEBUG_OFF, dump_text=False,
+                                   spill_dir=str(tmp_path / "spill"))
+    live = []
+    processor.process_all(workers=workers, files=files, progress=lambda n, total, pdf: live.append(_live_results()))
+
+    assert not processor.errors
+    assert len(processor.results) == len(files)
+    assert max(live) <= 2 * workers
@@ -0,0 +1,17 @@
+from benchmarks.fixtures import CONFIG, return_rows, write_pdf
+from modules.ITR1 import DEBUG_OFF, ITR1BatchProcessor
+
+
+def test_isolated_batch_applies_results_in_listing_order(tmp_path):
+    # Same acknowledgement twice: the later file in the listing wins, as in a serial
+    # run, although the slow earlier one finishes last
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    write_pdf(str(pdf_dir / "a.pdf"), return_rows(30, seed=1, pan="AAAAA1111A"))
+    write_pdf(str(pdf_dir / "b.pdf"), return_rows(2, seed=2, pan="BBBBB2222B"))
+
+    processor = ITR1BatchProcessor(str(pdf_dir), CONFIG, debug=DEBUG_OFF, dump_text=False, timeout=120)
+    processor.process_all(workers=2, files=["a.pdf", "b.pdf"])
+
+    assert not processor.errors
+    assert [itr.pan for itr in processor.results.values()] == ["BBBBB2222B"]
@@ -0,0 +1,247 @@
+import random
+import re
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fixtures import ROWS_PER_PAGE, _merged, _row, return_rows, write_pdf
+from modules.config_registry import EMPTY_ROW_SPECIFIC, load_config
+from modules.helper import clean_int, clean_row, extract_data, is_empty_row_specific
+from modules.ITR1 import DEBUG_OFF, ITR1Sections
+from modules.process_pdf import process_pdf
+from modules.row_store import RowStore, row_text
+
+try:
+    from re import _constants, _parser
+except ImportError:  # Python < 3.11
+    import sre_constants as _constants
+    import sre_parse as _parser
+
+# The optimised scans against the per-row implementations they replaced, on rows
+# pdfplumber reads back from fixture PDFs
+SECTION_CONFIGS = ["config/ITR1_header.json", "config/ITR2_header.json"]
+LINE_CONFIGS = ["config/ITR1_line.json", "config/ITR2_line.json", "config/ITR3_config.json"]
+
+
+# ---------------------------------------------------------
+# Reference implementations (as they were before the optimisations)
+# ---------------------------------------------------------
+def _first_start_loop(start_patterns, row_str):
+    for sec, pat in start_patterns.items():
+        if pat and pat.search(row_str):
+            return sec
+    return None
+
+
+def _extract_sections_loop(data, start_pattern, end_pattern, hdr_row_map):
+    sections = {}
+    current_section = None
+    start_index = None
+    expected = {sec for sec, pat in start_pattern.items() if pat}
+
+    for idx, row in enumerate(data):
+        row_str = " ".join(str(x) for x in row if x)
+        sec = _first_start_loop(start_pattern, row_str)
+        if sec:
+            current_section = sec
+            start_index = None
+
+        if current_section and not start_index:
+            hdrs = hdr_row_map.get(current_section, [])
+            if row and row[0] != "" and any(h in row for h in hdrs):
+                start_index = idx
+                continue
+
+        if current_section and start_index:
+            end_pat = end_pattern.get(current_section)
+            is_end = isinstance(end_pat, re.Pattern) and bool(end_pat.search(row_str))
+            if end_pat == EMPTY_ROW_SPECIFIC and is_empty_row_specific(row):
+                is_end = True
+            if is_end:
+                sections[current_section] = {"start": start_index, "end": idx + 1}
+                current_section = None
+                start_index = None
+                if expected <= sections.keys():
+                    break
+
+    return sections
+
+
+def _clean_row_per_cell(df):
+    df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
+    df = df.replace("", np.nan)
+    df = df.dropna(axis=1, how="all")
+    df = df.dropna(axis=0, how="all")
+    row_content = df.fillna("").astype(str).agg(" ".join, axis=1)
+    patterns_to_exclude = [
+        "If the return is verified after 30 days of transmission",
+        "Acknowledgement Number",
+    ]
+    masks = [row_content.str.contains(pattern, case=False, regex=True) for pattern in patterns_to_exclude]
+    df = df[~reduce(np.logical_or, masks)]
+    return df.dropna(axis=0, how="all")
+
+
+def _extract_data_per_field(extracted_rows, config_path):
+    result = {}
+    for data in load_config(config_path).fields.values():
+        result[data["id"]] = {}
+        keys = data["keys"]
+        if not keys:
+            continue
+        in_schedule = False
+        for row in extracted_rows:
+            row_content_str = " ".join(map(str, row))
+            if data["header_pattern"].search(row_content_str):
+                in_schedule = True
+            if in_schedule:
+                match = data["pattern"].search(row_content_str)
+                if match:
+                    if data["type"] == "NUMERIC" and data["expected_row_len"] == len(row):
+                        output = {key: clean_int(row[-(len(keys) - i)]) for i, key in enumerate(keys)}
+                    elif data["type"] == "NUMERIC":
+                        output = {key: clean_int(match.group(i + 1).strip()) for i, key in enumerate(keys)}
+                    else:
+                        output = {key: match.group(i + 1).strip() for i, key in enumerate(keys)}
+                    result[data["id"]] = output
+                    break
+    return result
+
+
+# ---------------------------------------------------------
+# Fixture rows
+# ---------------------------------------------------------
+def _sample(items, rng):
+    # Some text the parsed regex matches (digits for classes, shortest lazy repeats)
+    out = []
+    for op, av in items:
+        if op is _constants.LITERAL:
+            out.append(chr(av))
+        elif op is _constants.NOT_LITERAL:
+            out.append("x" if av != ord("x") else "y")
+        elif op is _constants.ANY:
+            out.append(" ")
+        elif op is _constants.IN:
+            out.append(_class_char(av))
+        elif op is _constants.CATEGORY:
+            out.append(_class_char([(op, av)]))
+        elif op is _constants.BRANCH:
+            out.append(_sample(rng.choice(av[1]), rng))
+        elif op is _constants.SUBPATTERN:
+            out.append(_sample(av[-1], rng))
+        elif op in (_constants.MAX_REPEAT, _constants.MIN_REPEAT):
+            low, high, sub = av
+            count = low if op is _constants.MIN_REPEAT else min(high, max(low, 1) + rng.randint(0, 2))
+            out.extend(_sample(sub, rng) for _ in range(count))
+    return "".join(out)
+
+
+def _class_char(items):
+    for op, av in items:
+        if op is _constants.LITERAL:
+            return chr(av)
+        if op is _constants.RANGE:
+            return chr(av[0])
+        if op is _constants.CATEGORY:
+            return {_constants.CATEGORY_DIGIT: "5", _constants.CATEGORY_SPACE: " "}.get(av, "a")
+    return "a"
+
+
+def _line_rows(config_path, seed=0):
+    # Schedule headers and a row for each field, shuffled, so some fields come before
+    # their schedule starts and several rows can match one field
+    rng = random.Random(seed)
+    rows = []
+    for field in load_config(config_path).fields.values():
+        for pattern in (field["header_pattern"], field["pattern"]):
+            text = _sample(_parser.parse(pattern.pattern, pattern.flags), rng)
+            if text.isascii():
+                rows.append(_merged(" ".join(text.split())))
+    rows += [_row("Gross receipts", "", "1,000")] * ROWS_PER_PAGE
+    rng.shuffle(rows)
+    return rows
+
+
+@pytest.fixture(scope="module")
+def pdf_rows(tmp_path_factory):
+    # pdfplumber rows of one fixture PDF per config
+    cache = {}
+
+    def read(config, rows):
+        if config not in cache:
+            pdf = tmp_path_factory.mktemp("pdf") / "return.pdf"
+            write_pdf(str(pdf), rows(config))
+            cache[config] = (str(pdf), process_pdf(str(pdf)))
+        return cache[config]
+
+    return read
+
+
+def _section_rows(config):
+    return return_rows(8, seed=5, config=config)
+
+
+# ---------------------------------------------------------
+# Tests
+# ---------------------------------------------------------
+@pytest.mark.parametrize("config", SECTION_CONFIGS)
+def test_start_scanner_matches_the_section_loop(pdf_rows, config):
+    _, rows = pdf_rows(config, _section_rows)
+    compiled = load_config(config)
+
+    found = [compiled.start_scanner.first_match(row_text(row)) for row in rows]
+
+    assert found == [_first_start_loop(compiled.start_patterns, row_text(row)) for row in rows]
+    assert set(found) - {None}
+
+
+@pytest.mark.parametrize("config", SECTION_CONFIGS)
+def test_extract_sections_matches_the_per_row_scan(pdf_rows, config):
+    pdf, rows = pdf_rows(config, _section_rows)
+    compiled = load_config(config)
+    itr = ITR1Sections(pdf, None, config, None, DEBUG_OFF)
+
+    sections = itr.extract_sections(rows, compiled.start_scanner, compiled.end_patterns, compiled.hdr_row_map)
+
+    assert sections
+    assert sections == _extract_sections_loop(rows, compiled.start_patterns, compiled.end_patterns,
+                                              compiled.hdr_row_map)
+
+
+@pytest.mark.parametrize("config", SECTION_CONFIGS)
+def test_row_store_frames_match_frames_of_row_lists(pdf_rows, config):
+    _, rows = pdf_rows(config, _section_rows)
+    store = RowStore(rows)
+    ranges = [(0, len(rows)), (0, 1), (3, 40), (len(rows) - 7, len(rows) + 5), (10, 10)]
+
+    assert [store[i] for i in range(len(rows))] == rows
+    assert store.texts == [row_text(row) for row in rows]
+    for start, end in ranges:
+        pd.testing.assert_frame_equal(store.frame(start, end), pd.DataFrame(rows[start:end]))
+
+
+@pytest.mark.parametrize("config", SECTION_CONFIGS)
+def test_clean_row_matches_the_per_cell_version(pdf_rows, config):
+    _, rows = pdf_rows(config, _section_rows)
+    compiled = load_config(config)
+    sections = _extract_sections_loop(rows, compiled.start_patterns, compiled.end_patterns, compiled.hdr_row_map)
+
+    assert sections
+    for meta in sections.values():
+        frame = pd.DataFrame(rows[meta["start"]:meta["end"]])
+        pd.testing.assert_frame_equal(clean_row(frame.copy()), _clean_row_per_cell(frame.copy()))
+    # Page furniture rows are dropped the same way
+    frame = pd.DataFrame(rows[:2] + rows[5:30])
+    pd.testing.assert_frame_equal(clean_row(frame.copy()), _clean_row_per_cell(frame.copy()))
+
+
+@pytest.mark.parametrize("config", LINE_CONFIGS)
+def test_extract_data_matches_the_per_field_scan(pdf_rows, config):
+    _, rows = pdf_rows(config, _line_rows)
+
+    result = extract_data(rows, config)
+
+    assert result == _extract_data_per_field(rows, config)
+    assert sum(1 for values in result.values() if values) >= len(result) // 4
@@ -0,0 +1,55 @@
+import pdfplumber
+
+from benchmarks.fixtures import CONFIG, ROWS_PER_PAGE, _row, return_rows, write_pdf
+from modules.config_registry import load_config
+from modules.ITR1 import DEBUG_OFF, ITR1Sections
+from modules.extract_cache import ExtractionCache
+from modules.process_pdf import iter_cached_pdf_rows
+
+
+def _return_pdf(tmp_path):
+    # Every section is found by page 4, then pages of rows outside any section
+    pdf = tmp_path / "return.pdf"
+    write_pdf(str(pdf), return_rows(4) + [_row("Gross receipts", "", "1,000")] * (3 * ROWS_PER_PAGE))
+    return pdf
+
+
+def test_second_run_of_complete_return_is_cache_hit(tmp_path):
+    pdf = _return_pdf(tmp_path)
+    cache = ExtractionCache(str(tmp_path / "cache"))
+
+    first = ITR1Sections(str(pdf), None, CONFIG, cache, DEBUG_OFF)
+    assert "extract_cache_hit" not in first.timer.counts
+    assert list((tmp_path / "cache").glob("*.json"))
+
+    second = ITR1Sections(str(pdf), None, CONFIG, cache, DEBUG_OFF)
+    assert second.timer.counts.get("extract_cache_hit") == 1
+    assert second.sections == first.sections
+    assert second.dataframes.keys() == first.dataframes.keys()
+    for name, frame in first.dataframes.items():
+        assert frame.equals(second.dataframes[name])
+
+
+def test_early_stop_with_cache_leaves_remaining_pages_unopened(tmp_path):
+    pdf = _return_pdf(tmp_path)
+    with pdfplumber.open(str(pdf)) as doc:
+        total = len(doc.pages)
+
+    uncached = ITR1Sections(str(pdf), None, CONFIG, None, DEBUG_OFF)
+    cached = ITR1Sections(str(pdf), None, CONFIG, ExtractionCache(str(tmp_path / "cache")), DEBUG_OFF)
+    assert cached.timer.counts["pages"] == uncached.timer.counts["pages"] < total
+
+
+def test_rows_cached_after_an_early_stop_are_not_a_full_document(tmp_path):
+    pdf = _return_pdf(tmp_path)
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    ITR1Sections(str(pdf), None, CONFIG, cache, DEBUG_OFF)
+
+    # Another reader (no stop_key) misses, and a reader reading past the stop gets every row
+    full = list(iter_cached_pdf_rows(str(pdf)))
+    assert list(iter_cached_pdf_rows(str(pdf), cache=cache)) == full
+    stats = {}
+    rows = list(iter_cached_pdf_rows(str(pdf), cache=cache, stats=stats,
+                                     stop_key=f"ITR1Sections:{load_config(CONFIG).digest}"))
+    assert stats["extract_cache_hit"] == 1
+    assert rows == full
@@ -0,0 +1,16 @@
+import pandas as pd
+
+from modules.helper import apply_amount_columns
+from modules.ITR1 import ITR1Sections
+
+
+def test_amount_columns_are_int_cells_in_the_section_frame():
+    df = pd.DataFrame({"Name": ["A", "B", "C"], "Amount": ["1,000", None, "2,500.00"], "Tax": ["Nil", "5", "6"]})
+    config = {"s": {"amount_columns": ["Amount", "Tax"]}}
+
+    frame = ITR1Sections.add_headers(apply_amount_columns(df, config, "s"), ["s", "PAN: X"])
+
+    amounts = frame[1].tolist()
+    assert amounts[:3] == ["PAN: X", "Amount", 1000] and pd.isna(amounts[3]) and amounts[4] == 2500
+    assert frame[2].tolist()[1:] == ["Tax", "Nil", 5, 6]
+    assert {type(v) for v in amounts[2:] if not pd.isna(v)} == {int}
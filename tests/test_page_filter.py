@@ -0,0 +1,25 @@
+import pytest
+
+from benchmarks.fixtures import ROWS_PER_PAGE, _row, return_rows, write_pdf
+from modules.ITR1 import DEBUG_OFF, ITR1Sections
+
+# The bundled section configs (the *_line.json files are line-item configs)
+SECTION_CONFIGS = ["config/ITR1_header.json", "config/ITR2_header.json"]
+
+
+@pytest.mark.parametrize("config", SECTION_CONFIGS)
+def test_prefiltered_run_builds_the_same_sections(tmp_path, config):
+    # Pages of rows outside any section between the metadata and the sections
+    rows = return_rows(8, seed=3, config=config)
+    rows[2:2] = [_row("Gross receipts", "", "1,000")] * (3 * ROWS_PER_PAGE)
+    pdf = tmp_path / "return.pdf"
+    write_pdf(str(pdf), rows)
+
+    full = ITR1Sections(str(pdf), None, config, None, DEBUG_OFF)
+    filtered = ITR1Sections(str(pdf), None, config, None, DEBUG_OFF, prefilter=True)
+
+    assert filtered.page_filter.skipped
+    assert full.dataframes
+    assert filtered.dataframes.keys() == full.dataframes.keys()
+    for name, frame in full.dataframes.items():
+        assert frame.equals(filtered.dataframes[name]), name
@@ -0,0 +1,73 @@
+"""
+Spool daemon: watch a folder for ITR PDFs and keep per-PAN workbooks up to date.
+
+    python watch.py SPOOL_DIR --config config/ITR1_header.json [--workers 4] [--node NAME]
+    python watch.py SPOOL_DIR --config auto                      # mixed ITR1/ITR2/ITR3 returns
+
+Drop PDFs into SPOOL_DIR/inbox (ideally write them elsewhere on the same filesystem
+and move them in). Each one is claimed by an atomic rename into SPOOL_DIR/work/<node>,
+processed on a warm worker pool, and its PAN's workbook is rewritten in
+SPOOL_DIR/outbox; the PDF then moves to done/ (or failed/, with the error next to
+it). Several daemons, on one host or on nodes sharing the filesystem, can serve the
+same spool: give each a distinct --node. SIGTERM / Ctrl-C stops claiming and
+finishes the files in flight; a restarted daemon resumes its own unfinished claims.
+"""
+import argparse
+import signal
+import sys
+
+from modules.config_registry import ConfigError
+from modules.extract_cache import ExtractionCache
+from modules.form_sniffer import FormRouter
+from modules.spool import POLL_SECONDS, SETTLE_SECONDS, SpoolDaemon
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("spool_dir", help="spool folder (inbox/, outbox/, ... are created in it)")
+    parser.add_argument("--config", required=True,
+                        help="section config (e.g. config/ITR1_header.json), or 'auto' to route by form type")
+    parser.add_argument("--config-dir", default="config", help="configs for --config auto")
+    parser.add_argument("--fallback-config", default=None,
+                        help="with --config auto: section config for PDFs whose form is not recognised")
+    parser.add_argument("--workers", type=int, default=2, help="warm worker processes")
+    parser.add_argument("--node", default=None, help="name of this daemon in work/ (default: host name)")
+    parser.add_argument("--cache-dir", default=None, help="reuse extracted rows across runs (ExtractionCache)")
+    parser.add_argument("--prefilter", action="store_true",
+                        help="only run table extraction on pages whose text can hold a configured section")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="seconds between inbox scans")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                        help="leave inbox PDFs modified less than this many seconds ago (still being copied)")
+    parser.add_argument("--reclaim-after", type=float, default=None,
+                        help="take over files another node claimed more than this many seconds ago")
+    parser.add_argument("--once", action="store_true", help="drain the inbox, then exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        router = FormRouter(args.config_dir, args.fallback_config) if args.config == "auto" else None
+        daemon = SpoolDaemon(args.spool_dir, None if router else args.config, router=router,
+                             workers=args.workers, node=args.node,
+                             cache=ExtractionCache(args.cache_dir) if args.cache_dir else None,
+                             prefilter=args.prefilter, poll=args.poll, settle=args.settle,
+                             reclaim_after=args.reclaim_after, log=lambda msg: print(msg, flush=True))
+    except (OSError, ConfigError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    print(f"node {daemon.node}: watching {daemon.dirs['inbox']} with {args.workers} worker(s)", flush=True)
+    try:
+        processed, failed = daemon.run(once=args.once)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    print(f"stopped: {processed} processed, {failed} failed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())